@@ -8,6 +8,9 @@ This version creates two denormalized output files:
 1. method-performance.csv: Dataset x Method x Seed level (execution metrics including execution_time_seconds and runtime)
 2. metric-performance.csv: Dataset x Method x Seed x Metric level (clustering quality scores with score for k=true_k and metric-level runtime)
 
+Outputs are written as zstd-compressed parquet by default; pass --format csv
+or --format both for CSV.
+
 Usage:
   python 00_aggregate_scores.py <root_directories> [--format csv|parquet|both] [--debug] [--out_dir OUTPUT_DIR] [--cores CORES]
 
@@ -20,33 +23,50 @@ Examples:
 
 import argparse
 import csv
-import glob
-import gzip
+import io
 import json
 import os
 import re
 import warnings
 import multiprocessing
+import zlib
 from collections import defaultdict
-from functools import partial
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Set, Tuple, Optional, Any
 
 import pandas as pd
 import numpy as np
 
+try:
+    from isal import isal_zlib
+except ImportError:
+    isal_zlib = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Compressed size from which ISA-L's inflate (if installed) is used over zlib's;
+# below it ISA-L's higher per-call overhead outweighs its faster decoding
+ISAL_MIN_BYTES = 64 * 1024
 
-# Define a worker function for the process pool
-def process_dir(base_dir, debug_mode):
-    return process_run(base_dir, debug_mode)
+# Directory name patterns, compiled once at import
+DATASET_RE = re.compile(r'dataset_generator-(\w+)_dataset_name-(\w+)')
+METHOD_SEED_RE = re.compile(r'method-(.+?)_seed-(\d+)')
+LINKAGE_SEED_RE = re.compile(r'linkage-(.+?)_seed-(\d+)')
+METRIC_RE = re.compile(r'metric-(\w+)')
+BACKEND_TIMESTAMP_RE = re.compile(r'out[_-]([^_-]+)[_-](\d+)')
 
 
-def process_run(base_dir, debug_mode=False):
+def process_run(base_dir, debug_mode=False, cores=1):
     """
     Process a run directory containing clustbench results.
 
     This function handles both individual run directories (out_BACKEND-TIMESTAMP)
-    and parent directories containing multiple run directories.
+    and parent directories containing multiple run directories. Score files are
+    processed in a pool of `cores` worker processes when cores > 1.
 
     Returns:
         Tuple of (method_results, metric_results, backend, timestamp, duplicate_k_anomaly_files, dir_name)
@@ -65,10 +85,10 @@ def process_run(base_dir, debug_mode=False):
         # Find all run directories (directories that start with 'out_' or 'out-')
         run_dirs = []
         if os.path.exists(base_dir):
-            for item in os.listdir(base_dir):
-                item_path = os.path.join(base_dir, item)
-                if os.path.isdir(item_path) and (item.startswith('out_') or item.startswith('out-')):
-                    run_dirs.append(item_path)
+            with os.scandir(base_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith(('out_', 'out-')) and entry.is_dir():
+                        run_dirs.append(entry.path)
 
         if not run_dirs:
             print(f"No run directories found in {base_dir}")
@@ -76,7 +96,11 @@ def process_run(base_dir, debug_mode=False):
 
         print(f"Found {len(run_dirs)} run directories in {base_dir}")
 
-    # Process each run directory
+    # Collect the score files of each run directory. Dataset and parameters.json
+    # directories are absolute per run, so the lookup tables of all runs can be merged
+    tasks = []
+    dataset_index = {}
+    params_dirs = set()
     for run_dir in run_dirs:
         print(f"Processing run directory: {run_dir}")
 
@@ -87,9 +111,12 @@ def process_run(base_dir, debug_mode=False):
         if timestamp:
             timestamps_found.add(timestamp)
 
-        # Find all clustbench.scores.gz files
-        pattern = os.path.join(run_dir, '**/clustbench.scores.gz')
-        score_files = glob.glob(pattern, recursive=True)
+        # Find all clustbench.scores.gz, labels and parameters.json files in one traversal
+        score_files, label_files, run_params_dirs = scan_run_dir(run_dir)
+        params_dirs |= run_params_dirs
+
+        # Read each dataset's labels once instead of once per score file
+        dataset_index.update(build_dataset_index(label_files))
 
         print(f"Found {len(score_files)} score files in {run_dir}")
 
@@ -98,23 +125,26 @@ def process_run(base_dir, debug_mode=False):
             for f in score_files[:3]:  # Show first 3 files
                 print(f"  {f}")
 
-        # Process each score file
-        for score_file in score_files:
-            try:
-                method_result, metric_result = process_scores_file(score_file, backend, timestamp, run_dir)
+        tasks.extend((score_file, backend, timestamp, run_dir) for score_file in score_files)
 
-                if method_result:
-                    all_method_results.append(method_result)
-                if metric_result:
-                    all_metric_results.append(metric_result)
+    # Process each score file, errors are handled per file by process_scores_file.
+    # Workers receive the lookup tables once at startup rather than with every task
+    if cores > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(processes=cores, initializer=_worker_init,
+                                  initargs=(dataset_index, params_dirs)) as pool:
+            file_results = pool.starmap(_process_one, tasks, chunksize=32)
+    else:
+        file_results = [process_scores_file(*task, dataset_index, params_dirs) for task in tasks]
 
-                # Check for duplicate k anomaly
-                if metric_result and metric_result.get('duplicate_k_anomaly', False):
-                    all_duplicate_k_anomaly_files.append(score_file)
+    for task, (method_result, metric_result) in zip(tasks, file_results):
+        if method_result:
+            all_method_results.append(method_result)
+        if metric_result:
+            all_metric_results.append(metric_result)
 
-            except Exception as e:
-                print(f"Error processing {score_file}: {e}")
-                continue
+        # Check for duplicate k anomaly
+        if metric_result and metric_result.get('duplicate_k_anomaly', False):
+            all_duplicate_k_anomaly_files.append(task[0])
 
     # Return single values for backend and timestamp if only one found
     backend = list(backends_found)[0] if len(backends_found) == 1 else None
@@ -124,40 +154,148 @@ def process_run(base_dir, debug_mode=False):
             all_duplicate_k_anomaly_files, os.path.basename(base_dir))
 
 
-def extract_dataset_info(path: str) -> Tuple[str, str]:
-    """Extract dataset generator and name from path or parameters.json"""
+# Lookup tables of the run being processed, set in each worker process by _worker_init
+_worker_dataset_index = None
+_worker_params_dirs = None
+
+
+def _worker_init(dataset_index, params_dirs):
+    """Store the dataset index and parameters.json directories in a worker process"""
+    global _worker_dataset_index, _worker_params_dirs
+    _worker_dataset_index = dataset_index
+    _worker_params_dirs = params_dirs
+
+
+def _process_one(file_path, backend, timestamp, source_dir):
+    """process_scores_file using the lookup tables set by _worker_init"""
+    return process_scores_file(file_path, backend, timestamp, source_dir,
+                               _worker_dataset_index, _worker_params_dirs)
+
+
+def scan_run_dir(run_dir: str) -> Tuple[List[str], Dict[str, List[str]], Set[str]]:
+    """
+    Walk a run directory once, collecting score files, dataset label files and
+    the directories that contain a parameters.json.
+
+    Hidden directories are skipped and symlinked directories are followed,
+    as with a recursive '**' glob.
+
+    Returns:
+        Tuple of (score_files, label_files, params_dirs) where label_files maps each
+        directory to the clustbench.labels*.gz files it contains
+    """
+    score_files = []
+    label_files = {}
+    params_dirs = set()
+    for dir_path, dir_names, file_names in os.walk(run_dir, followlinks=True):
+        dir_names[:] = [d for d in dir_names if not d.startswith('.')]
+        if 'parameters.json' in file_names:
+            params_dirs.add(dir_path)
+        if 'clustbench.scores.gz' in file_names:
+            score_files.append(os.path.join(dir_path, 'clustbench.scores.gz'))
+        labels = [os.path.join(dir_path, f) for f in file_names
+                  if f.startswith('clustbench.labels') and f.endswith('.gz')]
+        if labels:
+            label_files[dir_path] = labels
+    return score_files, label_files, params_dirs
+
+
+@lru_cache(maxsize=4096)
+def read_params(params_file: str) -> Dict[str, Any]:
+    """
+    Read a parameters.json file, caching the result per path.
+
+    Many score files share the same ancestor directories, so each file is
+    read only once. Returns an empty dict if the file is missing or does not
+    contain a JSON object; a malformed file is reported once and its failure
+    cached like any other result. The returned dict is shared between callers
+    and must not be modified.
+    """
+    if not os.path.exists(params_file):
+        return {}
+    with open(params_file, 'rb') as f:
+        data = f.read()
+    try:
+        # orjson (if installed) parses the raw bytes without a text decoding pass
+        params = orjson.loads(data) if orjson is not None else json.loads(data)
+    except ValueError as e:
+        print(f"Warning: Could not parse {params_file}: {e}")
+        return {}
+    return params if isinstance(params, dict) else {}
+
+
+def params_for_dir(directory: str, params_dirs: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """
+    Return the parameters.json contents of a directory.
+
+    If params_dirs (as returned by scan_run_dir) is given, directories not in it
+    are known to have no parameters.json and are not probed on disk.
+    """
+    if params_dirs is not None and directory not in params_dirs:
+        return {}
+    return read_params(os.path.join(directory, 'parameters.json'))
+
+
+def extract_dataset_info(path: str, params_dirs: Optional[Set[str]] = None) -> Tuple[str, str]:
+    """
+    Extract dataset generator and name from path or parameters.json
+
+    The directory-name pattern is matched once against the whole path. If it
+    does not match, the ancestor directories are visited once, from the
+    deepest up, and the first parameters.json naming a dataset is used.
+    """
     # Try to get from directory name
-    dir_match = re.search(r'dataset_generator-(\w+)_dataset_name-(\w+)', path)
+    dir_match = DATASET_RE.search(path)
     if dir_match:
         return dir_match.group(1), dir_match.group(2)
 
-    # Try to get from parameters.json
-    params_file = os.path.join(os.path.dirname(path), 'parameters.json')
-    if os.path.exists(params_file):
-        with open(params_file, 'r') as f:
-            try:
-                params = json.load(f)
-                return params.get('dataset_generator', ''), params.get('dataset_name', '')
-            except:
-                pass
+    # Try to get from parameters.json in the ancestor directories
+    current_dir = os.path.dirname(path)
+    while True:
+        params = params_for_dir(current_dir, params_dirs)
+        if 'dataset_generator' in params or 'dataset_name' in params:
+            return params.get('dataset_generator', ''), params.get('dataset_name', '')
+
+        parent_dir = os.path.dirname(current_dir)
+        if parent_dir == current_dir:  # Reached root
+            return '', ''
+        current_dir = parent_dir
+
+
+def normalize_method_name(name: str) -> str:
+    """Normalize method name by replacing hyphens with underscores, except for linkage- prefix"""
+    if name.startswith('linkage-'):
+        return name  # Keep linkage- as is
+    return name.replace('-', '_')
+
+
+def method_from_dir_name(base_dir: str, parent_dir: str) -> Optional[Dict[str, Any]]:
+    """Extract method name and seed from a directory name, or None if it is not a method directory"""
+    # Check for method-name_seed-123 pattern
+    seed_match = METHOD_SEED_RE.search(base_dir)
+    if seed_match:
+        return {'method': normalize_method_name(seed_match.group(1)), 'seed': int(seed_match.group(2))}
+
+    # Just a regular method without seed
+    if base_dir.startswith('method-'):
+        return {'method': normalize_method_name(base_dir.split('-', 1)[1]), 'seed': None}
+
+    # Check for clustering library and linkage method pattern
+    if base_dir.startswith('linkage-') and parent_dir in ['agglomerative', 'fastcluster', 'sklearn']:
+        # Check if linkage part has seed
+        linkage_seed_match = LINKAGE_SEED_RE.search(base_dir)
+        if linkage_seed_match:
+            linkage_name = f"linkage-{linkage_seed_match.group(1)}"
+            return {'method': f"{parent_dir}_{linkage_name}", 'seed': int(linkage_seed_match.group(2))}
+        return {'method': f"{parent_dir}_{base_dir}", 'seed': None}
 
-    # Go up one level and try again
-    parent_dir = os.path.dirname(os.path.dirname(path))
-    if parent_dir == path:  # Stop recursion at root
-        return '', ''
-    return extract_dataset_info(parent_dir)
+    return None
 
 
-def extract_method_info(path: str) -> Dict[str, Any]:
+def extract_method_info(path: str, params_dirs: Optional[Set[str]] = None) -> Dict[str, Any]:
     """Extract method name and seed from path or parameters.json"""
     result = {'method': '', 'seed': None}
 
-    def normalize_method_name(name: str) -> str:
-        """Normalize method name by replacing hyphens with underscores, except for linkage- prefix"""
-        if name.startswith('linkage-'):
-            return name  # Keep linkage- as is
-        return name.replace('-', '_')
-
     # Find the method directory
     current_dir = os.path.dirname(path)
     for _ in range(5):  # Limit recursion depth
@@ -165,73 +303,38 @@ def extract_method_info(path: str) -> Dict[str, Any]:
             break
 
         # Look for parameters.json in the current directory
-        params_file = os.path.join(current_dir, 'parameters.json')
-        if os.path.exists(params_file):
-            with open(params_file, 'r') as f:
-                try:
-                    params = json.load(f)
-                    method = params.get('method', '')
-                    if method:
-                        result['method'] = normalize_method_name(method)
-                        if 'seed' in params:
-                            result['seed'] = int(params['seed'])
-                        return result
-                except:
-                    pass
-
-        # Look for method in directory name with possible seed
-        base_dir = os.path.basename(current_dir)
-
-        # Check for method-name_seed-123 pattern
-        seed_match = re.search(r'method-(.+?)_seed-(\d+)', base_dir)
-        if seed_match:
-            result['method'] = normalize_method_name(seed_match.group(1))
-            result['seed'] = int(seed_match.group(2))
-            return result
-
-        # Just a regular method without seed
-        if base_dir.startswith('method-'):
-            result['method'] = normalize_method_name(base_dir.split('-', 1)[1])
+        params = params_for_dir(current_dir, params_dirs)
+        method = params.get('method', '')
+        if method:
+            result['method'] = normalize_method_name(method)
+            try:
+                result['seed'] = int(params['seed'])
+            except (KeyError, TypeError, ValueError):
+                pass
             return result
 
-        # Check for clustering library and linkage method pattern
-        if base_dir.startswith('linkage-'):
-            parent_dir = os.path.basename(os.path.dirname(current_dir))
-            if parent_dir in ['agglomerative', 'fastcluster', 'sklearn']:
-                # Check if linkage part has seed
-                linkage_seed_match = re.search(r'linkage-(.+?)_seed-(\d+)', base_dir)
-                if linkage_seed_match:
-                    linkage_name = f"linkage-{linkage_seed_match.group(1)}"
-                    result['method'] = f"{parent_dir}_{linkage_name}"
-                    result['seed'] = int(linkage_seed_match.group(2))
-                    return result
-                else:
-                    result['method'] = f"{parent_dir}_{base_dir}"
-                    return result
+        # Look for method in directory name with possible seed
+        dir_result = method_from_dir_name(os.path.basename(current_dir),
+                                          os.path.basename(os.path.dirname(current_dir)))
+        if dir_result:
+            return dir_result
 
         current_dir = os.path.dirname(current_dir)
 
     return result
 
 
-def extract_metric_info(path: str) -> str:
+def extract_metric_info(path: str, params_dirs: Optional[Set[str]] = None) -> str:
     """Extract metric name from path or parameters.json"""
     # Try to get from directory name
-    dir_match = re.search(r'metric-(\w+)', path)
+    dir_match = METRIC_RE.search(path)
     if dir_match:
         return dir_match.group(1)
 
     # Try to get from parameters.json
-    params_file = os.path.join(os.path.dirname(path), 'parameters.json')
-    if os.path.exists(params_file):
-        with open(params_file, 'r') as f:
-            try:
-                params = json.load(f)
-                metric = params.get('metric', '')
-                if metric:
-                    return metric
-            except:
-                pass
+    metric = params_for_dir(os.path.dirname(path), params_dirs).get('metric', '')
+    if metric:
+        return metric
 
     # If we still don't have a metric, check the path components directly
     """
@@ -244,6 +347,61 @@ def extract_metric_info(path: str) -> str:
     return ''
 
 
+def fast_extract(path: str, dir_parts: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Extract dataset, method, seed and metric from the path alone.
+
+    Only directory names are inspected, parameters.json is never read.
+    Fields that cannot be derived from the path are left empty ('' or None).
+    dir_parts is the path's directory already split on os.sep, if the caller has it.
+    """
+    result = {'dataset_generator': '', 'dataset_name': '', 'method': '', 'seed': None, 'metric': ''}
+
+    dataset_match = DATASET_RE.search(path)
+    if dataset_match:
+        result['dataset_generator'] = dataset_match.group(1)
+        result['dataset_name'] = dataset_match.group(2)
+
+    metric_match = METRIC_RE.search(path)
+    if metric_match:
+        result['metric'] = metric_match.group(1)
+
+    # Same directory levels as extract_method_info, without the parameters.json lookup
+    parts = dir_parts if dir_parts is not None else os.path.dirname(path).split(os.sep)
+    for level in range(len(parts) - 1, max(len(parts) - 6, -1), -1):
+        base_dir = parts[level]
+        # Every method directory name contains 'method-' or starts with 'linkage-'
+        if 'method-' not in base_dir and not base_dir.startswith('linkage-'):
+            continue
+        method_info = method_from_dir_name(base_dir, parts[level - 1] if level > 0 else '')
+        if method_info:
+            result.update(method_info)
+            break
+
+    return result
+
+
+# perf.json keys for each performance column
+PERF_JSON_FIELDS = {
+    'runtime': 'total_time_secs',
+    'threads': 'max_threads',
+    'disk_read': 'total_disk_read_bytes',
+    'disk_write': 'total_disk_write_bytes',
+    'avg_load': 'avg_cpu_usage',
+    'peak_rss': 'peak_mem_rss_kb',
+}
+
+
+def empty_perf_data() -> Dict[str, Any]:
+    """Performance columns with every value missing"""
+    return dict.fromkeys(PERF_JSON_FIELDS)
+
+
+def perf_data_from_json(perf_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map the contents of a perf.json file onto the performance columns"""
+    return {column: perf_data.get(key) for column, key in PERF_JSON_FIELDS.items()}
+
+
 def extract_performance_data(file_path: str) -> Dict[str, Any]:
     """Extract performance metrics from method's perf.json file"""
     debug_info = {"file": file_path}
@@ -292,14 +450,7 @@ def extract_performance_data(file_path: str) -> Dict[str, Any]:
 
         if method_dir is None:
             debug_info["no_method_dir"] = True
-            return {
-                'runtime': None,
-                'threads': None,
-                'disk_read': None,
-                'disk_write': None,
-                'avg_load': None,
-                'peak_rss': None
-            }
+            return empty_perf_data()
 
         debug_info["method_dir_before"] = method_dir
 
@@ -319,14 +470,7 @@ def extract_performance_data(file_path: str) -> Dict[str, Any]:
                 perf_data = json.load(f)
                 debug_info["perf_data_keys"] = list(perf_data.keys())
 
-                result = {
-                    'runtime': perf_data.get('total_time_secs'),
-                    'threads': perf_data.get('max_threads'),
-                    'disk_read': perf_data.get('total_disk_read_bytes'),
-                    'disk_write': perf_data.get('total_disk_write_bytes'),
-                    'avg_load': perf_data.get('avg_cpu_usage'),
-                    'peak_rss': perf_data.get('peak_mem_rss_kb')
-                }
+                result = perf_data_from_json(perf_data)
 
                 # Debug sampling
                 if hash(file_path) % 1000 == 0:
@@ -345,14 +489,7 @@ def extract_performance_data(file_path: str) -> Dict[str, Any]:
     if hash(file_path) % 1000 == 0:
         print(f"DEBUG (no perf data): {debug_info}")
 
-    return {
-        'runtime': None,
-        'threads': None,
-        'disk_read': None,
-        'disk_write': None,
-        'avg_load': None,
-        'peak_rss': None
-    }
+    return empty_perf_data()
 
 
 def extract_metric_performance_data(file_path: str) -> Dict[str, Any]:
@@ -368,60 +505,58 @@ def extract_metric_performance_data(file_path: str) -> Dict[str, Any]:
             with open(perf_file, 'r') as f:
                 perf_data = json.load(f)
 
-                return {
-                    'runtime': perf_data.get('total_time_secs'),
-                    'threads': perf_data.get('max_threads'),
-                    'disk_read': perf_data.get('total_disk_read_bytes'),
-                    'disk_write': perf_data.get('total_disk_write_bytes'),
-                    'avg_load': perf_data.get('avg_cpu_usage'),
-                    'peak_rss': perf_data.get('peak_mem_rss_kb')
-                }
+                return perf_data_from_json(perf_data)
 
     except Exception as e:
         print(f"Error reading metric perf.json file for {file_path}: {e}")
 
-    return {
-        'runtime': None,
-        'threads': None,
-        'disk_read': None,
-        'disk_write': None,
-        'avg_load': None,
-        'peak_rss': None
-    }
+    return empty_perf_data()
+
 
+@lru_cache(maxsize=4096)
+def _read_perf(method_dir: str) -> Optional[float]:
+    """
+    Read the 's' (seconds) column of a method's clustbench_performance.txt.
+
+    Cached per method directory, since every metric under a method shares the
+    same file. Returns None if the file or the column is missing.
+    """
+    perf_file = os.path.join(method_dir, 'clustbench_performance.txt')
+    if not os.path.exists(perf_file):
+        return None
+
+    with open(perf_file, 'r') as f:
+        # Read the header line to get column positions
+        header = f.readline().strip().split('\t')
+        # Read the data line
+        data_line = f.readline().strip()
+
+    if data_line and 's' in header:
+        data = data_line.split('\t')
+        s_index = header.index('s')
+        if s_index < len(data):
+            try:
+                return float(data[s_index])
+            except ValueError:
+                return None
+    return None
 
-def find_method_performance(file_path: str) -> Optional[float]:
+
+def find_method_performance(file_path: str, dir_parts: Optional[List[str]] = None) -> Optional[float]:
     """Extract execution time from method's clustbench_performance.txt file"""
     try:
         # Navigate from score file to method directory
         # Path: .../method-XXX/metrics/partition_metrics/metric-YYY/clustbench.scores.gz
         # Go up 4 levels: metric-YYY -> partition_metrics -> metrics -> method-XXX
-        current_dir = os.path.dirname(file_path)  # metric-YYY
-        partition_metrics_dir = os.path.dirname(current_dir)  # partition_metrics
-        metrics_dir = os.path.dirname(partition_metrics_dir)  # metrics
-        method_dir = os.path.dirname(metrics_dir)  # method-XXX
-
-        # Look for clustbench_performance.txt file in method directory
-        perf_file = os.path.join(method_dir, 'clustbench_performance.txt')
+        if dir_parts is not None:
+            method_dir = os.sep.join(dir_parts[:-3])
+        else:
+            current_dir = os.path.dirname(file_path)  # metric-YYY
+            partition_metrics_dir = os.path.dirname(current_dir)  # partition_metrics
+            metrics_dir = os.path.dirname(partition_metrics_dir)  # metrics
+            method_dir = os.path.dirname(metrics_dir)  # method-XXX
 
-        if os.path.exists(perf_file):
-            with open(perf_file, 'r') as f:
-                # Read the header line to get column positions
-                header = f.readline().strip().split('\t')
-                # Read the data line
-                data_line = f.readline().strip()
-
-                if data_line:
-                    data = data_line.split('\t')
-                    # Find the 's' (seconds) column index
-                    if 's' in header:
-                        s_index = header.index('s')
-                        if s_index < len(data):
-                            try:
-                                execution_time = float(data[s_index])
-                                return execution_time
-                            except ValueError:
-                                return None
+        return _read_perf(method_dir)
 
     except Exception as e:
         print(f"Error reading performance file for {file_path}: {e}")
@@ -429,51 +564,91 @@ def find_method_performance(file_path: str) -> Optional[float]:
     return None
 
 
-def extract_dataset_true_k_and_noise(file_path: str) -> Tuple[Optional[int], Optional[bool]]:
-    """Extract true k value and noise presence ONLY from labels files"""
-    try:
-        current_dir = os.path.dirname(file_path)
+def find_dataset_dir(file_path: str, dir_parts: Optional[List[str]] = None) -> Optional[str]:
+    """Find the dataset directory (dataset_generator-X_dataset_name-Y) above a file"""
+    if dir_parts is not None:
+        for level in range(len(dir_parts) - 1, max(len(dir_parts) - 11, -1), -1):
+            basename = dir_parts[level]
+            if 'dataset_generator-' in basename and 'dataset_name-' in basename:
+                return os.sep.join(dir_parts[:level + 1])
+        return None
+
+    test_dir = os.path.dirname(file_path)
+    for _ in range(10):  # Limit search depth
+        basename = os.path.basename(test_dir)
+        if 'dataset_generator-' in basename and 'dataset_name-' in basename:
+            return test_dir
+        if test_dir == os.path.dirname(test_dir):
+            break
+        test_dir = os.path.dirname(test_dir)
+    return None
 
-        # Navigate up to find dataset directory
-        dataset_dir = None
-        max_levels = 10
-        levels = 0
-        test_dir = current_dir
 
-        while levels < max_levels:
-            basename = os.path.basename(test_dir)
-            if 'dataset_generator-' in basename and 'dataset_name-' in basename:
-                dataset_dir = test_dir
-                break
-            if test_dir == os.path.dirname(test_dir):
-                break
-            test_dir = os.path.dirname(test_dir)
-            levels += 1
+def true_k_and_noise_from_labels(label_files: List[str]) -> Tuple[Optional[int], Optional[bool]]:
+    """Count unique non-zero labels and detect noise (label 0) in the first usable labels file"""
+    for label_file in label_files:
+        try:
+            labels = pd.read_csv(io.StringIO(read_gzip_text(label_file)), header=None, na_filter=False)
+            # One label per line; the per-line float() parse rejected anything else
+            if labels.shape[1] != 1:
+                continue
+            labels = labels.iloc[:, 0].to_numpy(dtype=np.float64)
+            # int() rejects nan/inf labels, but the cast would turn them into a cluster
+            if not np.isfinite(labels).all():
+                continue
+            labels = labels.astype(np.int64)
+            unique_labels = np.unique(labels)
+            has_noise = bool((unique_labels == 0).any())
+
+            # Do not count 0 (noise) as a cluster
+            true_k = int(unique_labels.size) - int(has_noise)
+            if true_k > 0:
+                return true_k, has_noise
+        except Exception as e:
+            continue
+
+    # If no labels file found, return None for both
+    return None, None
 
+
+def build_dataset_index(label_files: Dict[str, List[str]]) -> Dict[str, Tuple[Optional[int], Optional[bool]]]:
+    """
+    Compute true k and noise presence once per dataset directory.
+
+    label_files is the labels file listing from scan_run_dir. Only dataset
+    directories (dataset_generator-X_dataset_name-Y) are indexed.
+    """
+    dataset_index = {}
+    for dataset_dir, dataset_label_files in label_files.items():
+        basename = os.path.basename(dataset_dir)
+        if 'dataset_generator-' in basename and 'dataset_name-' in basename:
+            dataset_index[dataset_dir] = true_k_and_noise_from_labels(dataset_label_files)
+    return dataset_index
+
+
+def extract_dataset_true_k_and_noise(file_path: str,
+                                     dataset_index: Optional[Dict[str, Tuple[Optional[int], Optional[bool]]]] = None,
+                                     dir_parts: Optional[List[str]] = None
+                                     ) -> Tuple[Optional[int], Optional[bool]]:
+    """
+    Extract true k value and noise presence ONLY from labels files
+
+    If dataset_index (as returned by build_dataset_index) is given, the values are
+    looked up there instead of reading the dataset's labels files.
+    dir_parts is the file's directory split on os.sep, as in fast_extract.
+    """
+    try:
+        dataset_dir = find_dataset_dir(file_path, dir_parts)
         if dataset_dir is None:
             return None, None
 
-        # Only try to find labels files and count unique non-zero labels
-        label_files = glob.glob(os.path.join(dataset_dir, 'clustbench.labels*.gz'))
-        for label_file in label_files:
-            try:
-                with gzip.open(label_file, 'rt') as f:
-                    labels = [int(float(line.strip())) for line in f if line.strip()]
-                    unique_labels = set(labels)
-                    has_noise = 0 in unique_labels
-
-                    # Remove 0 (noise) from the count if present
-                    if has_noise:
-                        unique_labels.remove(0)
-
-                    true_k = len(unique_labels)
-                    if true_k > 0:
-                        return true_k, has_noise
-            except Exception as e:
-                continue
+        if dataset_index is not None:
+            return dataset_index.get(dataset_dir, (None, None))
 
-        # If no labels file found, return None for both
-        return None, None
+        with os.scandir(dataset_dir) as entries:
+            label_files = [entry.path for entry in entries
+                           if entry.name.startswith('clustbench.labels') and entry.name.endswith('.gz')]
+        return true_k_and_noise_from_labels(label_files)
 
     except Exception as e:
         print(f"Error reading dataset parameters for {file_path}: {e}")
@@ -486,18 +661,87 @@ def extract_backend_timestamp(run_dir: str) -> Tuple[Optional[str], Optional[str
     basename = os.path.basename(run_dir)
 
     # Match patterns like: out_apptainer-202505301205, out-conda_202506231301
-    match = re.match(r'out[_-]([^_-]+)[_-](\d+)', basename)
+    match = BACKEND_TIMESTAMP_RE.match(basename)
     if match:
         return match.group(1), match.group(2)
 
     return None, None
 
 
+def read_gzip_text(path: str) -> str:
+    """
+    Read a gzip-compressed text file in one go.
+
+    Score files are only a couple of lines long, so the setup cost of a
+    GzipFile dominates reading them. Instead the raw bytes are inflated
+    directly with zlib, member by member for multi-member files. Large files
+    such as labels are inflated with ISA-L when the isal package is installed.
+    """
+    raw = Path(path).read_bytes()
+    inflate = isal_zlib if isal_zlib is not None and len(raw) >= ISAL_MIN_BYTES else zlib
+    chunks = []
+    while raw:
+        decompressor = inflate.decompressobj(wbits=16 + inflate.MAX_WBITS)
+        chunks.append(decompressor.decompress(raw))
+        if not decompressor.eof:
+            raise EOFError(f"Compressed file ended before the end-of-stream marker was reached: {path}")
+        # Like gzip.open, skip zero padding after a member
+        raw = decompressor.unused_data.lstrip(b'\x00')
+    return b''.join(chunks).decode('utf-8')
+
+
+def parse_score_values(fields: List[str]) -> List[Any]:
+    """
+    Convert a row of score fields to floats.
+
+    The whole row is parsed in one NumPy conversion. If any field is not
+    numeric, fields are parsed one at a time and non-numeric values are
+    kept as strings.
+    """
+    try:
+        return np.asarray(fields, dtype=np.float64).tolist()
+    except ValueError:
+        values = []
+        for field in fields:
+            try:
+                values.append(float(field))
+            except ValueError:
+                values.append(field)
+        return values
+
+
+def has_duplicate_k_anomaly(k_names: List[str], k_scores: List[Any], tolerance: float = 1e-3) -> bool:
+    """
+    Check whether a repeated k column has a score differing from its first occurrence.
+
+    Headers rarely repeat a k, which is checked with a set before comparing. The
+    comparison itself is vectorized; non-numeric scores are never anomalous.
+    """
+    if len(set(k_names)) == len(k_names):
+        return False
+
+    _, first_index, inverse = np.unique(k_names, return_index=True, return_inverse=True)
+    try:
+        scores = np.asarray(k_scores, dtype=np.float64)
+    except (ValueError, TypeError):
+        scores = np.array([value if isinstance(value, float) else np.nan for value in k_scores])
+
+    # NaN (non-numeric) scores compare as not differing
+    first_scores = scores[first_index][inverse.ravel()]
+    return bool(np.any(np.abs(scores - first_scores) > tolerance))
+
+
 def process_scores_file(file_path: str, backend: Optional[str], timestamp: Optional[str],
-                       source_dir: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+                       source_dir: str,
+                       dataset_index: Optional[Dict[str, Tuple[Optional[int], Optional[bool]]]] = None,
+                       params_dirs: Optional[Set[str]] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
     """
     Process a clustbench.scores.gz file and extract method and metric data
 
+    dataset_index is the per-dataset true k and noise index from build_dataset_index,
+    params_dirs the parameters.json directories from scan_run_dir; without them the
+    filesystem is probed directly.
+
     Returns:
         Tuple of (method_result, metric_result)
         - method_result: Performance data at method level (one per method run)
@@ -506,18 +750,29 @@ def process_scores_file(file_path: str, backend: Optional[str], timestamp: Optio
     debug_this_file = hash(file_path) % 1000 == 0
 
     try:
-        # Extract information from the path
-        dataset_gen, dataset_name = extract_dataset_info(file_path)
-        method_info = extract_method_info(file_path)
-        method = method_info['method']
-        seed = method_info['seed']
-        metric = extract_metric_info(file_path)
+        # Extract information from the path, reading parameters.json only for fields
+        # the directory names do not provide
+        # The directory components are shared by the path-based extractors below
+        dir_parts = os.path.dirname(file_path).split(os.sep)
+        path_info = fast_extract(file_path, dir_parts)
+        dataset_gen = path_info['dataset_generator']
+        dataset_name = path_info['dataset_name']
+        if not (dataset_gen and dataset_name):
+            dataset_gen, dataset_name = extract_dataset_info(file_path, params_dirs)
+        method = path_info['method']
+        seed = path_info['seed']
+        if not method or seed is None:
+            # parameters.json may still give the seed when the directory name has none
+            method_info = extract_method_info(file_path, params_dirs)
+            method = method or method_info['method']
+            seed = method_info['seed']
+        metric = path_info['metric'] or extract_metric_info(file_path, params_dirs)
 
         # Extract dataset info
-        true_k, has_noise = extract_dataset_true_k_and_noise(file_path)
+        true_k, has_noise = extract_dataset_true_k_and_noise(file_path, dataset_index, dir_parts)
 
         # Extract performance time (seconds) from the method directory
-        execution_time = find_method_performance(file_path)
+        execution_time = find_method_performance(file_path, dir_parts)
         if debug_this_file:
             print(f"DEBUG processing {file_path}, found execution_time: {execution_time}")
 
@@ -554,137 +809,72 @@ def process_scores_file(file_path: str, backend: Optional[str], timestamp: Optio
         # Add performance data
         method_result.update(perf_data)
 
+        # Metric result for files without score data
+        empty_metric_result = {
+            'source_dir': os.path.basename(source_dir),
+            'backend': backend,
+            'run_timestamp': timestamp,
+            'dataset_generator': dataset_gen,
+            'dataset_name': dataset_name,
+            'true_k': true_k,
+            'has_noise': has_noise,
+            'method': method,
+            'seed': seed,
+            'metric': metric,
+            'score': None,
+            'runtime': metric_perf_data.get('runtime'),
+            'duplicate_k_anomaly': False,
+            'empty_file': True,
+            'missing_true_k_score': False
+        }
+
         # Read the gzipped CSV file for metric data
-        with gzip.open(file_path, 'rt') as f:
-            content = f.read()
-            if not content.strip():
-                print(f"Warning: Empty file encountered: {file_path}")
-                metric_result = {
-                    'source_dir': os.path.basename(source_dir),
-                    'backend': backend,
-                    'run_timestamp': timestamp,
-                    'dataset_generator': dataset_gen,
-                    'dataset_name': dataset_name,
-                    'true_k': true_k,
-                    'has_noise': has_noise,
-                    'method': method,
-                    'seed': seed,
-                    'metric': metric,
-                    'score': None,
-                    'runtime': metric_perf_data.get('runtime'),
-                    'duplicate_k_anomaly': False,
-                    'empty_file': True,
-                    'missing_true_k_score': False
-                }
-                return method_result, metric_result
-
-            # Reset file pointer to beginning
-            f.seek(0)
-
-            # Read the header and data
-            reader = csv.reader(f)
-            try:
-                header = next(reader)
-                data_rows = list(reader)
-            except StopIteration:
-                print(f"Warning: CSV file has no header or data: {file_path}")
-                metric_result = {
-                    'source_dir': os.path.basename(source_dir),
-                    'backend': backend,
-                    'run_timestamp': timestamp,
-                    'dataset_generator': dataset_gen,
-                    'dataset_name': dataset_name,
-                    'true_k': true_k,
-                    'has_noise': has_noise,
-                    'method': method,
-                    'seed': seed,
-                    'metric': metric,
-                    'score': None,
-                    'runtime': metric_perf_data.get('runtime'),
-                    'duplicate_k_anomaly': False,
-                    'empty_file': True,
-                    'missing_true_k_score': False
-                }
-                return method_result, metric_result
-
-            if len(data_rows) == 0:
-                metric_result = {
-                    'source_dir': os.path.basename(source_dir),
-                    'backend': backend,
-                    'run_timestamp': timestamp,
-                    'dataset_generator': dataset_gen,
-                    'dataset_name': dataset_name,
-                    'true_k': true_k,
-                    'has_noise': has_noise,
-                    'method': method,
-                    'seed': seed,
-                    'metric': metric,
-                    'score': None,
-                    'runtime': metric_perf_data.get('runtime'),
-                    'duplicate_k_anomaly': False,
-                    'empty_file': True,
-                    'missing_true_k_score': False
-                }
-                return method_result, metric_result
-
-            # Process the data
-            data = data_rows[0]  # Assuming single row of values
-
-            # Check for duplicate k values with different results
-            duplicate_k_anomaly = False
-            k_values = {}
-            for i, k in enumerate(header):
-                if i < len(data):
-                    k_cleaned = k.strip('"')
-                    try:
-                        value = float(data[i])
-                        if k_cleaned in k_values:
-                            if abs(k_values[k_cleaned] - value) > 1e-3:
-                                duplicate_k_anomaly = True
-                        else:
-                            k_values[k_cleaned] = value
-                    except (ValueError, TypeError):
-                        if k_cleaned not in k_values:
-                            k_values[k_cleaned] = data[i]
-
-            # Create metric result
-            metric_result = {
-                'source_dir': os.path.basename(source_dir),
-                'backend': backend,
-                'run_timestamp': timestamp,
-                'dataset_generator': dataset_gen,
-                'dataset_name': dataset_name,
-                'true_k': true_k,
-                'has_noise': has_noise,
-                'method': method,
-                'seed': seed,
-                'metric': metric,
-                'score': None,
-                'runtime': metric_perf_data.get('runtime'),
-                'duplicate_k_anomaly': duplicate_k_anomaly,
-                'empty_file': False,
-                'missing_true_k_score': False
-            }
-
-            # Add k values from header and corresponding scores
-            for i, k in enumerate(header):
-                if i < len(data):
-                    k_cleaned = k.strip('"')
-                    try:
-                        metric_result[k_cleaned] = float(data[i])
-                    except ValueError:
-                        metric_result[k_cleaned] = data[i]
-
-            # Extract score for k=true_k and add as 'score' column
-            true_k_col = f'k={true_k}' if true_k is not None else None
-            if true_k_col and true_k_col in metric_result:
-                metric_result['score'] = metric_result[true_k_col]
-                metric_result['missing_true_k_score'] = False
-            else:
-                metric_result['score'] = None
-                metric_result['missing_true_k_score'] = True if true_k is not None else False
+        content = read_gzip_text(file_path)
+        if not content.strip():
+            print(f"Warning: Empty file encountered: {file_path}")
+            return method_result, empty_metric_result
+
+        # Read the header and data
+        reader = csv.reader(io.StringIO(content))
+        try:
+            header = next(reader)
+            # Only the first data row is used, so stop parsing after it
+            data = next(reader, None)
+        except StopIteration:
+            print(f"Warning: CSV file has no header or data: {file_path}")
+            return method_result, empty_metric_result
+
+        if data is None:
+            return method_result, empty_metric_result
+
+        # Process the data
+        n_fields = min(len(header), len(data))
+        k_names = [k.strip('"') for k in header[:n_fields]]
+        k_scores = parse_score_values(data[:n_fields])
+
+        # Check for duplicate k values with different results
+        duplicate_k_anomaly = has_duplicate_k_anomaly(k_names, k_scores)
+
+        # Create metric result
+        metric_result = dict(
+            empty_metric_result,
+            duplicate_k_anomaly=duplicate_k_anomaly,
+            empty_file=False,
+        )
+
+        # Add k values from header and corresponding scores
+        metric_result.update(zip(k_names, k_scores))
+
+        # Extract score for k=true_k and add as 'score' column
+        true_k_col = f'k={true_k}' if true_k is not None else None
+        if true_k_col and true_k_col in metric_result:
+            metric_result['score'] = metric_result[true_k_col]
+            metric_result['missing_true_k_score'] = False
+        else:
+            metric_result['score'] = None
+            metric_result['missing_true_k_score'] = True if true_k is not None else False
 
-            return method_result, metric_result
+        return method_result, metric_result
 
     except Exception as e:
         import traceback
@@ -694,6 +884,53 @@ def process_scores_file(file_path: str, backend: Optional[str], timestamp: Optio
         return None, None
 
 
+CATEGORICAL_COLUMNS = ['source_dir', 'backend', 'dataset_generator', 'dataset_name', 'method', 'metric']
+FLAG_COLUMNS = ['duplicate_k_anomaly', 'empty_file', 'missing_true_k_score']
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert low-cardinality metadata columns to compact dtypes.
+
+    String columns that repeat a small set of values become categoricals,
+    the always-set flag columns plain numpy bools, has_noise a nullable
+    boolean and true_k a nullable Int32. Columns not present in the
+    DataFrame are skipped.
+    """
+    dtypes = {col: 'category' for col in CATEGORICAL_COLUMNS if col in df.columns}
+    dtypes.update({col: 'bool' for col in FLAG_COLUMNS if col in df.columns})
+    if 'has_noise' in df.columns:
+        dtypes['has_noise'] = 'boolean'
+    if 'true_k' in df.columns:
+        dtypes['true_k'] = 'Int32'
+    return df.astype(dtypes)
+
+
+def write_csv(df: pd.DataFrame, path: str) -> None:
+    """
+    Write a DataFrame to CSV without the index.
+
+    Always uses pandas' writer so the output bytes do not depend on which optional
+    packages are installed (pyarrow's writer quotes every string and renders
+    booleans and floats differently).
+    """
+    df.to_csv(path, index=False, lineterminator='\n')
+
+
+def write_parquet(df: pd.DataFrame, path: str) -> None:
+    """
+    Write a DataFrame to zstd-compressed parquet without the index.
+
+    Score columns keep non-numeric values such as "NA" as strings, which a
+    parquet float column cannot hold, so they are written as missing values.
+    """
+    mixed = [col for col in df.columns
+             if (col == 'score' or col.startswith('k=')) and df[col].dtype == object]
+    if mixed:
+        df = df.assign(**{col: pd.to_numeric(df[col], errors='coerce') for col in mixed})
+    df.to_parquet(path, compression='zstd', index=False)
+
+
 def main():
     """
     Main function to aggregate all clustbench.scores.gz files into two denormalized datasets:
@@ -709,8 +946,8 @@ def main():
     parser.add_argument('--out_dir', type=str, default='.', help='Output directory for aggregated results')
     parser.add_argument('--debug', '-d', action='store_true',
                         help='Enable debug output')
-    parser.add_argument('--format', '-f', type=str, choices=['csv', 'parquet', 'both'], default='csv',
-                        help='Output format: csv, parquet, or both (default: csv)')
+    parser.add_argument('--format', '-f', type=str, choices=['csv', 'parquet', 'both'], default='parquet',
+                        help='Output format: csv, parquet, or both (default: parquet)')
     parser.add_argument('--cores', '-c', type=int, default=multiprocessing.cpu_count(),
                         help='Number of CPU cores to use for parallel processing')
     args = parser.parse_args()
@@ -722,39 +959,24 @@ def main():
     all_duplicate_k_anomaly_files = []
     source_dirs = []
 
-    # Process directories
-    if args.cores > 1 and len(args.root_dirs) > 1:
+    # Process directories, parallelizing over the score files within each
+    if args.cores > 1:
         print(f"Using {args.cores} CPU cores for parallel processing...")
-        with multiprocessing.Pool(processes=args.cores) as pool:
-            process_results = pool.map(partial(process_dir, debug_mode=args.debug), args.root_dirs)
-
-            for result_tuple in process_results:
-                method_results, metric_results, backend, timestamp, duplicate_k_anomaly_files, dir_name = result_tuple
-                if method_results:
-                    all_method_results.extend(method_results)
-                if metric_results:
-                    all_metric_results.extend(metric_results)
-                if backend and backend not in all_backends:
-                    all_backends.append(backend)
-                if timestamp and timestamp not in all_timestamps:
-                    all_timestamps.append(timestamp)
-                all_duplicate_k_anomaly_files.extend(duplicate_k_anomaly_files)
-                source_dirs.append(dir_name)
     else:
-        if args.cores == 1:
-            print("Using single-core processing...")
-        for base_dir in args.root_dirs:
-            method_results, metric_results, backend, timestamp, duplicate_k_anomaly_files, dir_name = process_run(base_dir, args.debug)
-            if method_results:
-                all_method_results.extend(method_results)
-            if metric_results:
-                all_metric_results.extend(metric_results)
-            if backend and backend not in all_backends:
-                all_backends.append(backend)
-            if timestamp and timestamp not in all_timestamps:
-                all_timestamps.append(timestamp)
-            all_duplicate_k_anomaly_files.extend(duplicate_k_anomaly_files)
-            source_dirs.append(dir_name)
+        print("Using single-core processing...")
+    for base_dir in args.root_dirs:
+        method_results, metric_results, backend, timestamp, duplicate_k_anomaly_files, dir_name = process_run(
+            base_dir, args.debug, args.cores)
+        if method_results:
+            all_method_results.extend(method_results)
+        if metric_results:
+            all_metric_results.extend(metric_results)
+        if backend and backend not in all_backends:
+            all_backends.append(backend)
+        if timestamp and timestamp not in all_timestamps:
+            all_timestamps.append(timestamp)
+        all_duplicate_k_anomaly_files.extend(duplicate_k_anomaly_files)
+        source_dirs.append(dir_name)
 
     # Create output directory if it doesn't exist
     if not os.path.exists(args.out_dir):
@@ -792,62 +1014,58 @@ def main():
             if key not in method_df_data:
                 method_df_data[key] = result
 
-        method_df = pd.DataFrame(list(method_df_data.values()))
-
-        # Organize columns
+        # Build the DataFrame with its columns already in output order
         method_meta_columns = ['source_dir', 'backend', 'run_timestamp', 'dataset_generator',
                               'dataset_name', 'true_k', 'has_noise', 'method', 'seed',
                               'execution_time_seconds', 'runtime', 'threads', 'disk_read',
                               'disk_write', 'avg_load', 'peak_rss']
-        method_df = method_df[method_meta_columns]
+        method_df = optimize_dtypes(pd.DataFrame(list(method_df_data.values()), columns=method_meta_columns))
 
         # Output method performance
         if args.format in ['csv', 'both']:
             method_csv_file = os.path.join(args.out_dir, f"method-performance_{base_name}.csv")
-            method_df.to_csv(method_csv_file, index=False)
+            write_csv(method_df, method_csv_file)
             print(f"Method performance data saved to {method_csv_file}")
 
         if args.format in ['parquet', 'both']:
             method_parquet_file = os.path.join(args.out_dir, f"method-performance_{base_name}.parquet")
-            method_df.to_parquet(method_parquet_file, index=False)
+            write_parquet(method_df, method_parquet_file)
             print(f"Method performance parquet saved to {method_parquet_file}")
 
         print(f"Method performance dataset: {len(method_df)} records")
 
     # Process metric results
     if all_metric_results:
-        metric_df = pd.DataFrame(all_metric_results)
-
-        # Organize columns - metadata first, then k values
-        all_columns = metric_df.columns.tolist()
+        # Organize columns - metadata first, then k values in order of first appearance
         metric_meta_columns = ['source_dir', 'backend', 'run_timestamp', 'dataset_generator',
                               'dataset_name', 'true_k', 'has_noise', 'method', 'seed', 'metric', 'score',
                               'runtime', 'duplicate_k_anomaly', 'empty_file', 'missing_true_k_score']
-        k_columns = [col for col in all_columns if col not in metric_meta_columns]
+        k_columns = list(dict.fromkeys(col for result in all_metric_results for col in result
+                                       if col not in metric_meta_columns))
 
         # Sort k columns numerically
         def extract_k(col):
             if col.startswith('k='):
                 try:
                     return int(col.split('=')[1])
-                except:
+                except ValueError:
                     return 999999
             return 999999
 
         k_columns.sort(key=extract_k)
 
-        # Reorder columns
-        metric_df = metric_df[metric_meta_columns + k_columns]
+        # Build the DataFrame with its columns already in output order
+        metric_df = optimize_dtypes(pd.DataFrame(all_metric_results, columns=metric_meta_columns + k_columns))
 
         # Output metric performance
         if args.format in ['csv', 'both']:
             metric_csv_file = os.path.join(args.out_dir, f"metric-performance_{base_name}.csv")
-            metric_df.to_csv(metric_csv_file, index=False)
+            write_csv(metric_df, metric_csv_file)
             print(f"Metric performance data saved to {metric_csv_file}")
 
         if args.format in ['parquet', 'both']:
             metric_parquet_file = os.path.join(args.out_dir, f"metric-performance_{base_name}.parquet")
-            metric_df.to_parquet(metric_parquet_file, index=False)
+            write_parquet(metric_df, metric_parquet_file)
             print(f"Metric performance parquet saved to {metric_parquet_file}")
 
         print(f"Metric performance dataset: {len(metric_df)} records")
@@ -0,0 +1,22 @@
+"""Entry point for running a test module directly as a script"""
+
+import sys
+import unittest
+
+
+def run_module(path, pytest_args, **unittest_kwargs):
+    """
+    Run the test module at path, across CPUs when pytest-xdist is available.
+
+    Only a bare run is handed to pytest; test names given on the command line
+    (e.g. TestOutput.test_optimize_dtypes) are run by unittest as before.
+    """
+    if len(sys.argv) == 1:
+        try:
+            import pytest
+            import xdist  # noqa: F401
+        except ImportError:
+            pass
+        else:
+            sys.exit(pytest.main([path, *pytest_args]))
+    unittest.main(module='__main__', **unittest_kwargs)
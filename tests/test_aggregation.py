@@ -8,257 +8,363 @@ Streamlined test suite focusing on core functionality and integration tests.
 import unittest
 import tempfile
 import os
+import shutil
 import json
 import gzip
-import csv
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 import sys
 
-# Add the parent directory to the path to import the module
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add the parent directory to the path to import the module, whether run by
+# pytest, unittest discovery or directly, from any working directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
 
 from aggregate_scores import (
+    build_dataset_index,
+    empty_perf_data,
+    scan_run_dir,
     extract_dataset_info,
     extract_method_info,
     extract_metric_info,
     extract_performance_data,
     find_method_performance,
+    _read_perf,
     extract_dataset_true_k_and_noise,
     extract_backend_timestamp,
-    process_scores_file
+    fast_extract,
+    has_duplicate_k_anomaly,
+    parse_score_values,
+    process_scores_file,
+    read_gzip_text,
+    read_params,
+    optimize_dtypes,
+    write_csv
 )
 
+import numpy as np
+import pandas as pd
 
-class TestExtractionFunctions(unittest.TestCase):
-    """Test core extraction functions with key scenarios"""
 
-    def test_dataset_info_extraction(self):
-        """Test dataset info extraction from path"""
-        path = "/data/clustbench/dataset_generator-fcps_dataset_name-atom/clustering/method-test"
-        gen, name = extract_dataset_info(path)
-        self.assertEqual(gen, "fcps")
-        self.assertEqual(name, "atom")
+def write_gzip(path, text):
+    """Write text to a gzip file in a single compress call"""
+    with open(path, 'wb') as f:
+        f.write(gzip.compress(text.encode(), compresslevel=1))
 
-    def test_method_info_extraction_with_seed(self):
-        """Test method info extraction with seed"""
-        path = "/data/method-kmeans_seed-123/metrics/partition_metrics/metric-ari/clustbench.scores.gz"
-        result = extract_method_info(path)
-        self.assertEqual(result['method'], "kmeans")
-        self.assertEqual(result['seed'], 123)
 
-    def test_method_info_extraction_linkage(self):
-        """Test linkage method extraction"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Create directory structure for linkage method
-            linkage_dir = os.path.join(tmpdir, "agglomerative", "linkage-ward")
-            os.makedirs(linkage_dir)
+def read_plain_text(path):
+    """Stand-in for read_gzip_text that reads an uncompressed file"""
+    with open(path, 'r', newline='') as f:
+        return f.read()
+
+
+# Static input files shared by the tests
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def link_fixture(name, path):
+    """
+    Hard-link a file from tests/fixtures to path, copying it where hard links
+    are not supported. Linked files share the checked-in file's inode, so
+    tests must only read them.
+    """
+    source = os.path.join(FIXTURES_DIR, name)
+    try:
+        os.link(source, path)
+    except OSError:
+        shutil.copy(source, path)
 
-            path = os.path.join(linkage_dir, "metrics", "partition_metrics", "metric-ari", "clustbench.scores.gz")
-            result = extract_method_info(path)
-            self.assertEqual(result['method'], "agglomerative_linkage-ward")
 
-    def test_metric_info_extraction(self):
-        """Test metric info extraction from path"""
-        path = "/data/method-test/metrics/partition_metrics/metric-ari/clustbench.scores.gz"
-        metric = extract_metric_info(path)
-        self.assertEqual(metric, "ari")
+class TempDirTestCase(unittest.TestCase):
+    """Test case giving each test its own directory under one temporary root per class"""
 
-    def test_backend_timestamp_extraction(self):
-        """Test backend and timestamp extraction"""
-        backend, timestamp = extract_backend_timestamp("out_conda-202506231301")
-        self.assertEqual(backend, "conda")
-        self.assertEqual(timestamp, "202506231301")
+    @classmethod
+    def setUpClass(cls):
+        """Create the class's temporary root"""
+        super().setUpClass()
+        root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(root.cleanup)
+        cls.root = root.name
 
+    def setUp(self):
+        """Create the test's directory"""
+        self.tmpdir = os.path.join(self.root, self._testMethodName)
+        os.makedirs(self.tmpdir)
+
+
+class TestExtractionFunctions(unittest.TestCase):
+    """Test core extraction functions with key scenarios"""
 
-class TestPerformanceExtraction(unittest.TestCase):
+    # (function, argument, expected result) for extractions that only inspect the path
+    CASES = [
+        (extract_dataset_info,
+         "/data/clustbench/dataset_generator-fcps_dataset_name-atom/clustering/method-test",
+         ("fcps", "atom")),
+        (extract_method_info,
+         "/data/method-kmeans_seed-123/metrics/partition_metrics/metric-ari/clustbench.scores.gz",
+         {'method': "kmeans", 'seed': 123}),
+        (extract_method_info,
+         "/data/agglomerative/linkage-ward/metrics/partition_metrics/metric-ari/clustbench.scores.gz",
+         {'method': "agglomerative_linkage-ward", 'seed': None}),
+        (extract_metric_info,
+         "/data/method-test/metrics/partition_metrics/metric-ari/clustbench.scores.gz",
+         "ari"),
+        (extract_backend_timestamp, "out_conda-202506231301", ("conda", "202506231301")),
+    ]
+
+    def test_extractions(self):
+        """Test dataset, method, metric and backend extraction from paths"""
+        for function, argument, expected in self.CASES:
+            with self.subTest(function=function.__name__, argument=argument):
+                self.assertEqual(function(argument), expected)
+
+    def test_fast_extract(self):
+        """Test extraction of all path fields without reading parameters.json"""
+        path = ("/data/dataset_generator-fcps_dataset_name-atom/clustering/method-kmeans_seed-123/"
+                "metrics/partition_metrics/metric-ari/clustbench.scores.gz")
+        result = fast_extract(path)
+        self.assertEqual(result, {'dataset_generator': 'fcps', 'dataset_name': 'atom',
+                                  'method': 'kmeans', 'seed': 123, 'metric': 'ari'})
+        self.assertEqual(fast_extract(path, os.path.dirname(path).split(os.sep)), result)
+
+        linkage_path = "/data/agglomerative/linkage-ward/metrics/partition_metrics/metric-ari/clustbench.scores.gz"
+        result = fast_extract(linkage_path)
+        self.assertEqual(result['method'], "agglomerative_linkage-ward")
+        self.assertEqual(result['dataset_generator'], '')
+
+    def test_parse_score_values(self):
+        """Test score parsing keeps non-numeric fields as strings"""
+        self.assertEqual(parse_score_values(["0.8", "0.9"]), [0.8, 0.9])
+        self.assertEqual(parse_score_values(["0.8", "NA", ""]), [0.8, "NA", ""])
+
+    def test_duplicate_k_anomaly(self):
+        """Test duplicate k detection compares repeats against the first occurrence"""
+        self.assertFalse(has_duplicate_k_anomaly(["k=2", "k=3"], [0.8, 0.9]))
+        self.assertFalse(has_duplicate_k_anomaly(["k=2", "k=3", "k=3"], [0.8, 0.9, 0.9005]))
+        self.assertTrue(has_duplicate_k_anomaly(["k=3", "k=2", "k=3"], [0.9, 0.8, 0.85]))
+        self.assertFalse(has_duplicate_k_anomaly(["k=2", "k=2", "k=3"], [0.8, "NA", 0.9]))
+
+
+# perf.json payload for the performance extraction tests, serialized once
+PERF_JSON_BYTES = json.dumps({
+    "total_time_secs": 30.5,
+    "max_threads": 4,
+    "total_disk_read_bytes": 2048,
+    "total_disk_write_bytes": 1024,
+    "avg_cpu_usage": 80.0,
+    "peak_mem_rss_kb": 8192
+}).encode()
+
+
+class TestPerformanceExtraction(TempDirTestCase):
     """Test performance data extraction"""
 
     def test_find_method_performance_success(self):
         """Test successful extraction of method execution time"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            method_dir = os.path.join(tmpdir, "method-test")
-            os.makedirs(method_dir)
+        method_dir = os.path.join(self.tmpdir, "method-test")
+        scores_dir = os.path.join(method_dir, "metrics", "partition_metrics", "metric-ari")
+        os.makedirs(scores_dir)
 
-            # Create clustbench_performance.txt file
-            perf_file = os.path.join(method_dir, "clustbench_performance.txt")
-            with open(perf_file, 'w') as f:
-                f.write("s\tusr\tsys\tmaxrss\tixrss\tidrss\tisrss\tminflt\tmajflt\tnswap\tinblock\toublock\tmsgsnd\tmsgrcv\tnsignals\tnvcsw\tnivcsw\n")
-                f.write("45.67\t35.2\t10.47\t8192\t0\t0\t0\t200\t0\t0\t100\t50\t0\t0\t0\t20\t10\n")
+        # Create clustbench_performance.txt file
+        perf_file = os.path.join(method_dir, "clustbench_performance.txt")
+        with open(perf_file, 'w') as f:
+            f.write("s\tusr\tsys\tmaxrss\tixrss\tidrss\tisrss\tminflt\tmajflt\tnswap\tinblock\toublock\tmsgsnd\tmsgrcv\tnsignals\tnvcsw\tnivcsw\n")
+            f.write("45.67\t35.2\t10.47\t8192\t0\t0\t0\t200\t0\t0\t100\t50\t0\t0\t0\t20\t10\n")
 
-            scores_dir = os.path.join(method_dir, "metrics", "partition_metrics", "metric-ari")
-            os.makedirs(scores_dir)
-            score_file = os.path.join(scores_dir, "clustbench.scores.gz")
+        score_file = os.path.join(scores_dir, "clustbench.scores.gz")
 
-            result = find_method_performance(score_file)
-            self.assertEqual(result, 45.67)
+        result = find_method_performance(score_file)
+        self.assertEqual(result, 45.67)
+
+        # A second metric under the same method reuses the cached read
+        hits = _read_perf.cache_info().hits
+        other_file = os.path.join(method_dir, "metrics", "partition_metrics", "metric-nmi",
+                                  "clustbench.scores.gz")
+        self.assertEqual(find_method_performance(other_file), 45.67)
+        self.assertEqual(_read_perf.cache_info().hits, hits + 1)
 
     def test_find_method_performance_missing_file(self):
         """Test when performance file is missing"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            scores_dir = os.path.join(tmpdir, "method-test", "metrics", "partition_metrics", "metric-ari")
-            os.makedirs(scores_dir)
-            score_file = os.path.join(scores_dir, "clustbench.scores.gz")
+        scores_dir = os.path.join(self.tmpdir, "method-test", "metrics", "partition_metrics", "metric-ari")
+        os.makedirs(scores_dir)
+        score_file = os.path.join(scores_dir, "clustbench.scores.gz")
 
-            result = find_method_performance(score_file)
-            self.assertIsNone(result)
+        result = find_method_performance(score_file)
+        self.assertIsNone(result)
 
     def test_extract_performance_data_success(self):
         """Test successful extraction of performance data"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            method_dir = os.path.join(tmpdir, "method-test")
-            os.makedirs(method_dir)
-
-            perf_data = {
-                "total_time_secs": 30.5,
-                "max_threads": 4,
-                "total_disk_read_bytes": 2048,
-                "total_disk_write_bytes": 1024,
-                "avg_cpu_usage": 80.0,
-                "peak_mem_rss_kb": 8192
-            }
-
-            perf_file = os.path.join(method_dir, "perf.json")
-            with open(perf_file, 'w') as f:
-                json.dump(perf_data, f)
-
-            scores_dir = os.path.join(method_dir, "metrics", "partition_metrics", "metric-ari")
-            os.makedirs(scores_dir)
-            score_file = os.path.join(scores_dir, "clustbench.scores.gz")
-
-            result = extract_performance_data(score_file)
-            self.assertEqual(result['runtime'], 30.5)
-            self.assertEqual(result['threads'], 4)
-            self.assertEqual(result['disk_read'], 2048)
-            self.assertEqual(result['disk_write'], 1024)
-            self.assertEqual(result['avg_load'], 80.0)
-            self.assertEqual(result['peak_rss'], 8192)
-
-
-class TestDatasetTrueKAndNoise(unittest.TestCase):
-    """Test true k and noise extraction from labels"""
+        method_dir = os.path.join(self.tmpdir, "method-test")
+        scores_dir = os.path.join(method_dir, "metrics", "partition_metrics", "metric-ari")
+        os.makedirs(scores_dir)
 
-    def test_extract_true_k_and_noise_from_labels(self):
-        """Test successful extraction of true k and noise from labels file"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            dataset_dir = os.path.join(tmpdir, "dataset_generator-fcps_dataset_name-atom")
-            os.makedirs(dataset_dir)
-
-            # Create labels file with no noise
-            labels_file = os.path.join(dataset_dir, "clustbench.labels.gz")
-            with gzip.open(labels_file, 'wt') as f:
-                labels = [1, 1, 2, 2, 1, 2, 1, 2]
-                for label in labels:
-                    f.write(f"{label}\n")
-
-            method_dir = os.path.join(dataset_dir, "clustering", "method-test")
-            os.makedirs(method_dir)
-            scores_dir = os.path.join(method_dir, "metrics", "partition_metrics", "metric-ari")
-            os.makedirs(scores_dir)
-            score_file = os.path.join(scores_dir, "clustbench.scores.gz")
-
-            true_k, has_noise = extract_dataset_true_k_and_noise(score_file)
-            self.assertEqual(true_k, 2)
-            self.assertFalse(has_noise)
+        with open(os.path.join(method_dir, "perf.json"), 'wb') as f:
+            f.write(PERF_JSON_BYTES)
 
-    def test_extract_true_k_with_noise_from_labels(self):
-        """Test extraction when there is noise in labels file"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            dataset_dir = os.path.join(tmpdir, "dataset_generator-sklearn_make_blobs_dataset_name-test")
-            os.makedirs(dataset_dir)
+        score_file = os.path.join(scores_dir, "clustbench.scores.gz")
 
-            # Create labels file with noise (0 values)
-            labels_file = os.path.join(dataset_dir, "clustbench.labels.gz")
-            with gzip.open(labels_file, 'wt') as f:
-                labels = [1, 1, 2, 0, 1, 2, 0, 2]  # 0 indicates noise
-                for label in labels:
-                    f.write(f"{label}\n")
+        result = extract_performance_data(score_file)
+        self.assertEqual(result['runtime'], 30.5)
+        self.assertEqual(result['threads'], 4)
+        self.assertEqual(result['disk_read'], 2048)
+        self.assertEqual(result['disk_write'], 1024)
+        self.assertEqual(result['avg_load'], 80.0)
+        self.assertEqual(result['peak_rss'], 8192)
 
-            method_dir = os.path.join(dataset_dir, "clustering", "method-test")
-            os.makedirs(method_dir)
-            scores_dir = os.path.join(method_dir, "metrics", "partition_metrics", "metric-ari")
-            os.makedirs(scores_dir)
-            score_file = os.path.join(scores_dir, "clustbench.scores.gz")
 
-            true_k, has_noise = extract_dataset_true_k_and_noise(score_file)
-            self.assertEqual(true_k, 2)
-            self.assertTrue(has_noise)
+class TestReadGzipText(TempDirTestCase):
+    """Test reading gzip-compressed text files"""
 
+    def test_read_multi_member_file(self):
+        """Test that all members of a concatenated gzip file are read"""
+        path = os.path.join(self.tmpdir, "clustbench.scores.gz")
+        with open(path, 'wb') as f:
+            f.write(gzip.compress(b"k=2,k=3\n"))
+            f.write(gzip.compress(b"0.8,0.9\n"))
 
-class TestProcessScoresFile(unittest.TestCase):
-    """Integration tests for the main score file processing function"""
+        self.assertEqual(read_gzip_text(path), "k=2,k=3\n0.8,0.9\n")
 
-    def setUp(self):
-        """Set up test directory structure"""
-        self.tmpdir = tempfile.mkdtemp()
+    def test_read_zero_padded_file(self):
+        """Test that zero padding after and between members is skipped, as by gzip.open"""
+        path = os.path.join(self.tmpdir, "clustbench.scores.gz")
+        with open(path, 'wb') as f:
+            f.write(gzip.compress(b"k=2,k=3\n") + b"\x00" * 8)
+            f.write(gzip.compress(b"0.1,0.2\n") + b"\x00" * 16)
 
-        # Create dataset directory
-        self.dataset_dir = os.path.join(
-            self.tmpdir,
-            "dataset_generator-fcps_dataset_name-atom"
-        )
-        os.makedirs(self.dataset_dir)
-
-        # Create labels file for true_k and noise detection
-        labels_file = os.path.join(self.dataset_dir, "clustbench.labels.gz")
-        with gzip.open(labels_file, 'wt') as f:
-            # Write labels for 2 clusters (FCPS atom) with no noise
-            labels = [1, 1, 2, 2, 1, 2, 1, 2]
-            for label in labels:
-                f.write(f"{label}\n")
-
-        # Create method directory
-        self.method_dir = os.path.join(
-            self.dataset_dir,
-            "clustering",
-            "method-kmeans_seed-123"
-        )
-        os.makedirs(self.method_dir)
+        with gzip.open(path, 'rt') as f:
+            expected = f.read()
+        self.assertEqual(expected, "k=2,k=3\n0.1,0.2\n")
+        self.assertEqual(read_gzip_text(path), expected)
 
-        # Create clustbench_performance.txt file
-        with open(os.path.join(self.method_dir, "clustbench_performance.txt"), 'w') as f:
-            f.write("s\tusr\tsys\tmaxrss\tixrss\tidrss\tisrss\tminflt\tmajflt\tnswap\tinblock\toublock\tmsgsnd\tmsgrcv\tnsignals\tnvcsw\tnivcsw\n")
-            f.write("30.5\t25.2\t5.3\t4096\t0\t0\t0\t100\t0\t0\t50\t25\t0\t0\t0\t10\t5\n")
-
-        # Create perf.json
-        perf_data = {
-            "total_time_secs": 30.5,
-            "max_threads": 2,
-            "total_disk_read_bytes": 2048,
-            "total_disk_write_bytes": 1024,
-            "avg_cpu_usage": 80.0,
-            "peak_mem_rss_kb": 4096
-        }
-        with open(os.path.join(self.method_dir, "perf.json"), 'w') as f:
-            json.dump(perf_data, f)
-
-        # Create metric directory
-        self.metric_dir = os.path.join(
-            self.method_dir,
-            "metrics",
-            "partition_metrics",
-            "metric-ari"
-        )
+    def test_read_large_file(self):
+        """Test reading a file above the size from which ISA-L is used, if installed"""
+        text = "".join(f"{i % 7}\n" for i in range(200000))
+        path = os.path.join(self.tmpdir, "clustbench.labels0.gz")
+        with open(path, 'wb') as f:
+            f.write(gzip.compress(text.encode(), compresslevel=0))
+
+        self.assertEqual(read_gzip_text(path), text)
+
+    def test_read_empty_file(self):
+        """Test that empty files read as empty text"""
+        path = os.path.join(self.tmpdir, "clustbench.scores.gz")
+        write_gzip(path, "")
+
+        self.assertEqual(read_gzip_text(path), "")
+
+
+class TestDatasetTrueKAndNoise(TempDirTestCase):
+    """Test true k and noise extraction from labels"""
+
+    def test_extract_true_k_and_noise_from_labels(self):
+        """Test successful extraction of true k and noise from labels file"""
+        dataset_dir = os.path.join(self.tmpdir, "dataset_generator-fcps_dataset_name-atom")
+        scores_dir = os.path.join(dataset_dir, "clustering", "method-test", "metrics",
+                                  "partition_metrics", "metric-ari")
+        os.makedirs(scores_dir)
+
+        # Labels file with no noise
+        link_fixture("labels_nonoise.gz", os.path.join(dataset_dir, "clustbench.labels.gz"))
+
+        score_file = os.path.join(scores_dir, "clustbench.scores.gz")
+
+        true_k, has_noise = extract_dataset_true_k_and_noise(score_file)
+        self.assertEqual(true_k, 2)
+        self.assertFalse(has_noise)
+
+    def test_extract_true_k_with_noise_from_labels(self):
+        """Test extraction when there is noise in labels file"""
+        dataset_dir = os.path.join(self.tmpdir, "dataset_generator-sklearn_make_blobs_dataset_name-test")
+        scores_dir = os.path.join(dataset_dir, "clustering", "method-test", "metrics",
+                                  "partition_metrics", "metric-ari")
+        os.makedirs(scores_dir)
+
+        # Labels file with noise (0 values)
+        link_fixture("labels_noise.gz", os.path.join(dataset_dir, "clustbench.labels.gz"))
+
+        score_file = os.path.join(scores_dir, "clustbench.scores.gz")
+
+        true_k, has_noise = extract_dataset_true_k_and_noise(score_file)
+        self.assertEqual(true_k, 2)
+        self.assertTrue(has_noise)
+
+    def test_extract_true_k_and_noise_from_dataset_index(self):
+        """Test lookup of true k and noise in a prebuilt dataset index"""
+        dataset_dir = os.path.join(self.tmpdir, "dataset_generator-fcps_dataset_name-atom")
+        scores_dir = os.path.join(dataset_dir, "clustering", "method-test", "metrics",
+                                  "partition_metrics", "metric-ari")
+        os.makedirs(scores_dir)
+
+        write_gzip(os.path.join(dataset_dir, "clustbench.labels0.gz"), "0\n1\n2\n3\n")
+        score_file = os.path.join(scores_dir, "clustbench.scores.gz")
+        write_gzip(score_file, "k=3\n0.9\n")
+
+        score_files, label_files, _ = scan_run_dir(self.tmpdir)
+        dataset_index = build_dataset_index(label_files)
+
+        self.assertEqual(score_files, [score_file])
+        self.assertEqual(dataset_index, {dataset_dir: (3, True)})
+        self.assertEqual(extract_dataset_true_k_and_noise(score_file, dataset_index), (3, True))
+        dir_parts = os.path.dirname(score_file).split(os.sep)
+        self.assertEqual(extract_dataset_true_k_and_noise(score_file, dataset_index, dir_parts), (3, True))
+        # Datasets without labels files are not in the index
+        self.assertEqual(extract_dataset_true_k_and_noise(score_file, {}), (None, None))
+
+    def test_unusable_labels_files_are_skipped(self):
+        """Test that labels files with non-finite labels or several columns give no true k"""
+        dataset_dir = os.path.join(self.tmpdir, "dataset_generator-fcps_dataset_name-atom")
+        scores_dir = os.path.join(dataset_dir, "clustering", "method-test", "metrics",
+                                  "partition_metrics", "metric-ari")
+        os.makedirs(scores_dir)
+        score_file = os.path.join(scores_dir, "clustbench.scores.gz")
+        labels_file = os.path.join(dataset_dir, "clustbench.labels0.gz")
+
+        for text in ["1\n2\nnan\n", "1\n2\ninf\n", "1,2\n2,1\n"]:
+            with self.subTest(labels=text):
+                write_gzip(labels_file, text)
+                self.assertEqual(extract_dataset_true_k_and_noise(score_file), (None, None))
+
+
+class ScoresFileTestCase(TempDirTestCase):
+    """Base for process_scores_file tests on a kmeans method directory under an FCPS atom dataset"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Read the uncompressed fixture files in place of gzip files"""
+        super().setUpClass()
+        # Decompression is covered by TestReadGzipText; these tests only exercise
+        # parsing, so the .gz files are uncompressed fixtures read without inflating
+        gzip_patch = patch('aggregate_scores.read_gzip_text', read_plain_text)
+        gzip_patch.start()
+        cls.addClassCleanup(gzip_patch.stop)
+
+    def setUp(self):
+        """Set up test directory structure from the static fixture files"""
+        super().setUp()
+        self.dataset_dir = os.path.join(self.tmpdir, "dataset_generator-fcps_dataset_name-atom")
+        self.method_dir = os.path.join(self.dataset_dir, "clustering", "method-kmeans_seed-123")
+        self.metric_dir = os.path.join(self.method_dir, "metrics", "partition_metrics", "metric-ari")
         os.makedirs(self.metric_dir)
 
+        # Labels for 2 clusters (FCPS atom) with no noise
+        link_fixture("labels_nonoise.txt", os.path.join(self.dataset_dir, "clustbench.labels.gz"))
+
         # Create score file path
         self.score_file = os.path.join(self.metric_dir, "clustbench.scores.gz")
 
-    def tearDown(self):
-        """Clean up test directory"""
-        import shutil
-        shutil.rmtree(self.tmpdir)
+
+class TestProcessScoresFile(ScoresFileTestCase):
+    """Integration tests for the main score file processing function"""
+
+    def setUp(self):
+        """Add the method's performance files to the fixture tree"""
+        super().setUp()
+        link_fixture("clustbench_performance.txt", os.path.join(self.method_dir, "clustbench_performance.txt"))
+        link_fixture("perf.json", os.path.join(self.method_dir, "perf.json"))
 
     def test_process_scores_file_success(self):
         """Test successful processing of a scores file"""
-        # Create sample scores data
-        scores_data = [
-            ["k=2", "k=3", "k=4", "k=5"],
-            ["0.8", "0.9", "0.95", "0.85"]
-        ]
-
-        with gzip.open(self.score_file, 'wt') as f:
-            writer = csv.writer(f)
-            writer.writerows(scores_data)
+        link_fixture("scores_ok.csv", self.score_file)
 
         method_result, metric_result = process_scores_file(
             self.score_file, "conda", "202506231301", self.tmpdir
@@ -266,32 +372,51 @@ class TestProcessScoresFile(unittest.TestCase):
 
         # Test method result
         self.assertIsNotNone(method_result)
-        self.assertEqual(method_result['dataset_generator'], "fcps")
-        self.assertEqual(method_result['dataset_name'], "atom")
-        self.assertEqual(method_result['method'], "kmeans")
-        self.assertEqual(method_result['seed'], 123)
-        self.assertEqual(method_result['true_k'], 2)
-        self.assertFalse(method_result['has_noise'])
-        self.assertEqual(method_result['execution_time_seconds'], 30.5)
-        self.assertEqual(method_result['runtime'], 30.5)
-        self.assertEqual(method_result['threads'], 2)
+        expected_method = {
+            'dataset_generator': "fcps",
+            'dataset_name': "atom",
+            'method': "kmeans",
+            'seed': 123,
+            'true_k': 2,
+            'has_noise': False,
+            'execution_time_seconds': 30.5,
+            'runtime': 30.5,
+            'threads': 2,
+        }
+        self.assertEqual({key: method_result[key] for key in expected_method}, expected_method)
 
         # Test metric result
         self.assertIsNotNone(metric_result)
-        self.assertEqual(metric_result['metric'], "ari")
-        self.assertEqual(metric_result['k=2'], 0.8)
-        self.assertEqual(metric_result['k=3'], 0.9)
-        self.assertEqual(metric_result['k=4'], 0.95)
-        self.assertEqual(metric_result['k=5'], 0.85)
-        self.assertFalse(metric_result['duplicate_k_anomaly'])
-        self.assertFalse(metric_result['empty_file'])
-        self.assertFalse(metric_result['missing_true_k_score'])
+        expected_metric = {
+            'metric': "ari",
+            'k=2': 0.8,
+            'k=3': 0.9,
+            'k=4': 0.95,
+            'k=5': 0.85,
+            'duplicate_k_anomaly': False,
+            'empty_file': False,
+            'missing_true_k_score': False,
+        }
+        self.assertEqual({key: metric_result[key] for key in expected_metric}, expected_metric)
+
+
+class TestScoresFileFlags(ScoresFileTestCase):
+    """Test the metric result flags, with the performance file readers stubbed out"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Stub out the performance readers, which these tests do not exercise"""
+        super().setUpClass()
+        for target, return_value in [('aggregate_scores.find_method_performance', None),
+                                     ('aggregate_scores.extract_performance_data', empty_perf_data()),
+                                     ('aggregate_scores.extract_metric_performance_data', empty_perf_data())]:
+            perf_patch = patch(target, return_value=return_value)
+            perf_patch.start()
+            cls.addClassCleanup(perf_patch.stop)
 
     def test_process_scores_file_empty_file(self):
         """Test processing of an empty scores file"""
-        # Create empty gzipped file
-        with gzip.open(self.score_file, 'wt') as f:
-            pass  # Write nothing
+        link_fixture("scores_empty.csv", self.score_file)
 
         method_result, metric_result = process_scores_file(
             self.score_file, "conda", "202506231301", self.tmpdir
@@ -304,15 +429,7 @@ class TestProcessScoresFile(unittest.TestCase):
 
     def test_process_scores_file_duplicate_k_anomaly(self):
         """Test detection of duplicate k anomaly"""
-        # Create scores data with duplicate k values
-        scores_data = [
-            ["k=2", "k=3", "k=3", "k=4"],  # Duplicate k=3
-            ["0.8", "0.9", "0.85", "0.95"]
-        ]
-
-        with gzip.open(self.score_file, 'wt') as f:
-            writer = csv.writer(f)
-            writer.writerows(scores_data)
+        link_fixture("scores_duplicate_k.csv", self.score_file)
 
         method_result, metric_result = process_scores_file(
             self.score_file, "conda", "202506231301", self.tmpdir
@@ -323,15 +440,7 @@ class TestProcessScoresFile(unittest.TestCase):
 
     def test_process_scores_file_missing_true_k_score(self):
         """Test detection of missing true k score"""
-        # Create scores data without k=2 (true_k)
-        scores_data = [
-            ["k=3", "k=4", "k=5"],
-            ["0.9", "0.95", "0.85"]
-        ]
-
-        with gzip.open(self.score_file, 'wt') as f:
-            writer = csv.writer(f)
-            writer.writerows(scores_data)
+        link_fixture("scores_missing_true_k.csv", self.score_file)
 
         method_result, metric_result = process_scores_file(
             self.score_file, "conda", "202506231301", self.tmpdir
@@ -341,39 +450,164 @@ class TestProcessScoresFile(unittest.TestCase):
         self.assertTrue(metric_result['missing_true_k_score'])
 
 
-class TestComplexScenarios(unittest.TestCase):
+class TestComplexScenarios(TempDirTestCase):
     """Test complex and edge case scenarios"""
 
     def test_linkage_clustering_method(self):
         """Test processing of linkage-based clustering methods"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Create directory structure for linkage method
-            linkage_dir = os.path.join(tmpdir, "dataset_generator-fcps_dataset_name-atom",
-                                     "clustering", "agglomerative", "linkage-ward")
-            os.makedirs(linkage_dir)
+        # Create directory structure for linkage method
+        linkage_dir = os.path.join(self.tmpdir, "dataset_generator-fcps_dataset_name-atom",
+                                 "clustering", "agglomerative", "linkage-ward")
+        os.makedirs(linkage_dir)
 
-            path = os.path.join(linkage_dir, "metrics", "partition_metrics",
-                              "metric-ari", "clustbench.scores.gz")
-            result = extract_method_info(path)
-            self.assertEqual(result['method'], "agglomerative_linkage-ward")
+        path = os.path.join(linkage_dir, "metrics", "partition_metrics",
+                          "metric-ari", "clustbench.scores.gz")
+        result = extract_method_info(path)
+        self.assertEqual(result['method'], "agglomerative_linkage-ward")
 
     def test_method_with_parameters_json(self):
         """Test method extraction from parameters.json"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            method_dir = os.path.join(tmpdir, "method-test")
-            os.makedirs(method_dir)
+        method_dir = os.path.join(self.tmpdir, "method-test")
+        os.makedirs(method_dir)
 
-            # Create parameters.json
-            params = {"method": "dbscan", "seed": 456}
-            with open(os.path.join(method_dir, "parameters.json"), 'w') as f:
-                json.dump(params, f)
+        # Create parameters.json
+        params = {"method": "dbscan", "seed": 456}
+        with open(os.path.join(method_dir, "parameters.json"), 'w') as f:
+            json.dump(params, f)
 
-            path = os.path.join(method_dir, "metrics", "partition_metrics",
-                              "metric-ari", "clustbench.scores.gz")
-            result = extract_method_info(path)
-            self.assertEqual(result['method'], "dbscan")
-            self.assertEqual(result['seed'], 456)
+        path = os.path.join(method_dir, "metrics", "partition_metrics",
+                          "metric-ari", "clustbench.scores.gz")
+        result = extract_method_info(path)
+        self.assertEqual(result['method'], "dbscan")
+        self.assertEqual(result['seed'], 456)
+
+        # Directories missing from a scanned params_dirs set are not read
+        result = extract_method_info(path, params_dirs=set())
+        self.assertEqual(result['method'], "test")
+        self.assertIsNone(result['seed'])
+
+    def test_seed_from_parameters_json(self):
+        """Test the seed is read from parameters.json when the method directory name has none"""
+        method_dir = os.path.join(self.tmpdir, "dataset_generator-fcps_dataset_name-atom",
+                                  "clustering", "method-kmeans")
+        metric_dir = os.path.join(method_dir, "metrics", "partition_metrics", "metric-ari")
+        os.makedirs(metric_dir)
+        with open(os.path.join(method_dir, "parameters.json"), 'w') as f:
+            json.dump({"method": "kmeans", "seed": 7}, f)
+        score_file = os.path.join(metric_dir, "clustbench.scores.gz")
+        write_gzip(score_file, "k=2,k=3\n0.8,0.9\n")
+
+        self.assertEqual(fast_extract(score_file)['seed'], None)
+        method_result, metric_result = process_scores_file(score_file, "conda", "202501010000", self.tmpdir)
+        self.assertEqual(method_result['method'], "kmeans")
+        self.assertEqual(method_result['seed'], 7)
+        self.assertEqual(metric_result['seed'], 7)
+
+    def test_dataset_info_from_parameters_json(self):
+        """Test dataset extraction from parameters.json when the path has no dataset pattern"""
+        dataset_dir = os.path.join(self.tmpdir, "datasets", "atom")
+        metric_dir = os.path.join(dataset_dir, "method-test", "metrics", "partition_metrics", "metric-ari")
+        os.makedirs(metric_dir)
+
+        with open(os.path.join(dataset_dir, "parameters.json"), 'w') as f:
+            json.dump({"dataset_generator": "fcps", "dataset_name": "atom"}, f)
+        # parameters.json files without dataset fields are skipped
+        with open(os.path.join(metric_dir, "parameters.json"), 'w') as f:
+            json.dump({"metric": "ari"}, f)
+
+        gen, name = extract_dataset_info(os.path.join(metric_dir, "clustbench.scores.gz"))
+        self.assertEqual(gen, "fcps")
+        self.assertEqual(name, "atom")
+
+    def test_read_params_without_orjson(self):
+        """Test parameters.json parsing falls back to json when orjson is unavailable"""
+        params_file = os.path.join(self.tmpdir, "parameters.json")
+        with open(params_file, 'w') as f:
+            json.dump({"method": "dbscan", "seed": 456}, f)
+
+        with patch('aggregate_scores.orjson', None):
+            self.assertEqual(read_params(params_file), {"method": "dbscan", "seed": 456})
+
+    def test_malformed_parameters_json(self):
+        """Test a malformed parameters.json falls back to the directory name"""
+        method_dir = os.path.join(self.tmpdir, "method-test_seed-7")
+        os.makedirs(method_dir)
+        with open(os.path.join(method_dir, "parameters.json"), 'w') as f:
+            f.write('{"method": ')
+
+        path = os.path.join(method_dir, "metrics", "partition_metrics",
+                          "metric-ari", "clustbench.scores.gz")
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(extract_method_info(path), {'method': 'test', 'seed': 7})
+            self.assertEqual(extract_method_info(path), {'method': 'test', 'seed': 7})
+        # The parse failure is cached, so it is only reported once
+        self.assertEqual(mock_print.call_count, 1)
+
+
+class TestOutput(unittest.TestCase):
+    """Test writing aggregated output files"""
+
+    def test_write_csv_roundtrip(self):
+        """Test that written CSV files read back with the same values"""
+        df = pd.DataFrame({
+            'method': ['kmeans', 'dbscan'],
+            'seed': [42, None],
+            'k=2': [0.8, 0.9]
+        })
+        # Object column mixing floats and strings, as for "NA" scores
+        mixed_df = df.assign(**{'k=3': [0.7, 'NA']})
+
+        for frame in (df, mixed_df):
+            with self.subTest(columns=frame.columns.tolist()):
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    out_file = os.path.join(tmpdir, "out.csv")
+                    write_csv(frame, out_file)
+                    result = pd.read_csv(out_file)
+
+                self.assertEqual(result.columns.tolist(), frame.columns.tolist())
+                self.assertEqual(result['method'].tolist(), ['kmeans', 'dbscan'])
+                self.assertEqual(result['k=2'].tolist(), [0.8, 0.9])
+                self.assertEqual(result['seed'][0], 42)
+                self.assertTrue(pd.isna(result['seed'][1]))
+
+    def test_write_csv_format(self):
+        """Test that CSV output is byte-for-byte the pandas format"""
+        df = pd.DataFrame({
+            'method': ['kmeans', 'dbscan'],
+            'empty_file': [False, True],
+            'k=2': [1.0, 1e-05]
+        })
+        expected = b"method,empty_file,k=2\nkmeans,False,1.0\ndbscan,True,1e-05\n"
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            out_file = os.path.join(tmpdir, "out.csv")
+            write_csv(df, out_file)
+            with open(out_file, 'rb') as f:
+                self.assertEqual(f.read(), expected)
+
+    def test_optimize_dtypes(self):
+        """Test conversion of metadata columns to compact dtypes"""
+        df = pd.DataFrame({
+            'method': ['kmeans', 'kmeans', 'dbscan'],
+            'true_k': [2, None, 3],
+            'has_noise': [True, None, False],
+            'empty_file': [False, True, np.False_],
+            'k=2': [0.8, 0.9, 0.7]
+        })
+
+        result = optimize_dtypes(df)
+
+        self.assertIsInstance(result['method'].dtype, pd.CategoricalDtype)
+        self.assertEqual(result['true_k'].dtype, 'Int32')
+        self.assertEqual(result['has_noise'].dtype, 'boolean')
+        self.assertEqual(result['empty_file'].dtype, np.bool_)
+        self.assertEqual(result['k=2'].dtype, 'float64')
+        self.assertEqual(result['true_k'].tolist()[0], 2)
+        self.assertTrue(pd.isna(result['has_noise'][1]))
 
 
 if __name__ == '__main__':
-    unittest.main()
+    from script_main import run_module
+
+    # The test classes share no state, so run them across CPUs when pytest-xdist is available
+    run_module(__file__, ['-n', 'auto', '-q'])
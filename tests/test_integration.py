@@ -12,13 +12,20 @@ import tempfile
 import os
 import json
 import gzip
-import csv
 import shutil
+import itertools
+from collections import Counter
 from unittest.mock import patch
 import sys
 
-# Add the parent directory to the path to import the module
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path to import the module, whether run by
+# pytest, unittest discovery or directly, from any working directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
 
 from aggregate_scores import (
     process_run,
@@ -26,17 +33,53 @@ from aggregate_scores import (
     main
 )
 
+# Keep fixture trees on tmpfs where available
+TMP_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# clustbench_performance.txt: benchmark header plus one row of timings
+PERF_TSV_TEMPLATE = (
+    "s\tusr\tsys\tmaxrss\tixrss\tidrss\tisrss\tminflt\tmajflt\tnswap\tinblock\toublock\tmsgsnd\tmsgrcv\tnsignals\tnvcsw\tnivcsw\n"
+    "%s\t%s\t%s\t%d\t0\t0\t0\t%d\t0\t0\t%d\t%d\t0\t0\t0\t%d\t%d\n"
+)
+
+# perf.json payload shared by every method dir, serialized once
+PERF_JSON = {
+    "total_time_secs": 27.43,
+    "max_threads": 4,
+    "total_disk_read_bytes": 5210,
+    "total_disk_write_bytes": 2380,
+    "avg_cpu_usage": 61.7,
+    "peak_mem_rss_kb": 4096
+}
+PERF_JSON_BYTES = json.dumps(PERF_JSON).encode()
+
 
 class TestIntegration(unittest.TestCase):
     """Integration tests with realistic sample data"""
 
-    def setUp(self):
-        """Create a realistic clustbench output directory structure"""
-        self.test_dir = tempfile.mkdtemp()
+    # Values every result row must take from the fixture tree
+    _DATASET_GENS = frozenset({"fcps", "sklearn", "synthetic"})
+    _DATASET_NAMES = frozenset({"atom", "blobs", "moons"})
+    _METHODS = frozenset({"kmeans", "dbscan", "agglomerative"})
+    _METRICS = frozenset({"ari", "ami", "silhouette"})
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Create a realistic clustbench output directory structure.
+
+        The tree is built once for the class; the tests only read it.
+        """
+        tmp = tempfile.TemporaryDirectory(dir=TMP_ROOT)
+        cls.addClassCleanup(tmp.cleanup)
+        cls.test_dir = tmp.name
 
         # Create the main output directory structure
-        self.output_dir = os.path.join(self.test_dir, "out-conda_202506231301")
-        os.makedirs(self.output_dir)
+        cls.output_dir = os.path.join(cls.test_dir, "out-conda_202506231301")
+        os.makedirs(cls.output_dir)
+
+        # Score files in creation order
+        cls._score_files = []
 
         # Create multiple datasets
         datasets = [
@@ -55,116 +98,131 @@ class TestIntegration(unittest.TestCase):
         # Create multiple metrics
         metrics = ["ari", "ami", "silhouette"]
 
-        # Generate realistic data structure
-        for dataset_gen, dataset_name, n_clusters, noise in datasets:
-            dataset_dir = os.path.join(
-                self.output_dir,
+        # One seeded generator for the whole tree keeps the data reproducible
+        rng = np.random.default_rng(42)
+
+        # Precompute every directory and (path, bytes) file of the tree
+        method_runs = [
+            (method_name, seed) for method_name, seeds in methods for seed in seeds
+        ]
+        dataset_dirs = {
+            dataset: os.path.join(
+                cls.output_dir,
                 "data",
                 "clustbench",
-                f"dataset_generator-{dataset_gen}_dataset_name-{dataset_name}"
+                f"dataset_generator-{dataset[0]}_dataset_name-{dataset[1]}"
             )
-            os.makedirs(dataset_dir)
+            for dataset in datasets
+        }
+        method_dirs = {
+            (dataset, method_name, seed): os.path.join(
+                dataset_dirs[dataset],
+                "clustering",
+                f"method-{method_name}_seed-{seed}" if seed is not None else f"method-{method_name}"
+            )
+            for dataset, (method_name, seed) in itertools.product(datasets, method_runs)
+        }
+        score_files = [
+            (
+                os.path.join(
+                    method_dirs[dataset, method_name, seed],
+                    "metrics",
+                    "partition_metrics",
+                    f"metric-{metric}",
+                    "clustbench.scores.gz"
+                ),
+                dataset[2],
+                metric
+            )
+            for dataset, (method_name, seed), metric
+            in itertools.product(datasets, method_runs, metrics)
+        ]
 
-            # Create dataset parameters.json
+        all_files = []
+        for (dataset_gen, dataset_name, n_clusters, noise), dataset_dir in dataset_dirs.items():
             dataset_params = {
                 "dataset_generator": dataset_gen,
                 "dataset_name": dataset_name,
                 "n_clusters": n_clusters,
                 "noise": noise
             }
-            with open(os.path.join(dataset_dir, "parameters.json"), 'w') as f:
-                json.dump(dataset_params, f)
-
-            # Create clustering results for each method
-            for method_name, seeds in methods:
-                for seed in seeds:
-                    if seed is not None:
-                        method_dir_name = f"method-{method_name}_seed-{seed}"
-                    else:
-                        method_dir_name = f"method-{method_name}"
-
-                    method_dir = os.path.join(
-                        dataset_dir,
-                        "clustering",
-                        method_dir_name
-                    )
-                    os.makedirs(method_dir)
-
-                    # Create method performance file
-                    import random
-                    random.seed(42)  # For reproducible test data
-                    execution_time = round(random.uniform(5.0, 60.0), 2)
-                    with open(os.path.join(method_dir, "clustbench_performance.txt"), 'w') as f:
-                        f.write("s\tusr\tsys\tmaxrss\tixrss\tidrss\tisrss\tminflt\tmajflt\tnswap\tinblock\toublock\tmsgsnd\tmsgrcv\tnsignals\tnvcsw\tnivcsw\n")
-                        f.write(f"{execution_time}\t{execution_time*0.8}\t{execution_time*0.2}\t{random.randint(1024, 8192)}\t0\t0\t0\t{random.randint(50, 200)}\t0\t0\t{random.randint(10, 100)}\t{random.randint(5, 50)}\t0\t0\t0\t{random.randint(1, 20)}\t{random.randint(1, 10)}\n")
-
-                    # Create perf.json
-                    perf_data = {
-                        "total_time_secs": execution_time,
-                        "max_threads": random.randint(1, 8),
-                        "total_disk_read_bytes": random.randint(1000, 10000),
-                        "total_disk_write_bytes": random.randint(500, 5000),
-                        "avg_cpu_usage": round(random.uniform(20.0, 95.0), 1),
-                        "peak_mem_rss_kb": random.randint(1024, 8192)
-                    }
-                    with open(os.path.join(method_dir, "perf.json"), 'w') as f:
-                        json.dump(perf_data, f)
-
-                    # Create metrics for each metric type
-                    for metric in metrics:
-                        metric_dir = os.path.join(
-                            method_dir,
-                            "metrics",
-                            "partition_metrics",
-                            f"metric-{metric}"
-                        )
-                        os.makedirs(metric_dir)
-
-                        # Create realistic scores file
-                        score_file = os.path.join(metric_dir, "clustbench.scores.gz")
-                        self._create_realistic_scores_file(score_file, n_clusters, metric)
-
-    def tearDown(self):
-        """Clean up test directory"""
-        shutil.rmtree(self.test_dir)
-
-    def _create_realistic_scores_file(self, file_path, true_k, metric):
-        """Create a realistic scores file with sample data"""
-        import random
-        random.seed(42)  # For reproducible test data
-
+            all_files.append((
+                os.path.join(dataset_dir, "parameters.json"),
+                json.dumps(dataset_params).encode()
+            ))
+
+        # Method performance files are identical for every method, so render
+        # them once into a template dir and hardlink them into place
+        execution_time = PERF_JSON["total_time_secs"]
+        maxrss, minflt, inblock, oublock, nvcsw, nivcsw = rng.integers(
+            [1024, 50, 10, 5, 1, 1], [8193, 201, 101, 51, 21, 11]
+        ).tolist()
+        perf_txt = PERF_TSV_TEMPLATE % (
+            execution_time, execution_time*0.8, execution_time*0.2,
+            maxrss, minflt, inblock, oublock, nvcsw, nivcsw
+        )
+        template_dir = os.path.join(cls.test_dir, "templates")
+        templates = {
+            "clustbench_performance.txt": perf_txt.encode(),
+            "perf.json": PERF_JSON_BYTES
+        }
+        os.makedirs(template_dir)
+        for name, content in templates.items():
+            with open(os.path.join(template_dir, name), 'wb') as f:
+                f.write(content)
+
+        for score_file, n_clusters, metric in score_files:
+            all_files.append((score_file, cls._realistic_scores_bytes(rng, n_clusters, metric)))
+            cls._score_files.append(score_file)
+
+        # Parent-first creation: sorted order puts every parent before its children
+        all_dirs = {os.path.dirname(path) for path, _ in all_files}
+        for directory in sorted(all_dirs):
+            os.makedirs(directory, exist_ok=True)
+
+        for path, content in all_files:
+            with open(path, 'wb') as f:
+                f.write(content)
+
+        for method_dir, name in itertools.product(method_dirs.values(), templates):
+            template = os.path.join(template_dir, name)
+            target = os.path.join(method_dir, name)
+            try:
+                os.link(template, target)
+            except OSError:
+                shutil.copyfile(template, target)
+
+        # The tests only read the tree, so walk it once and share the results
+        cls._run_results = process_run(cls.output_dir, debug_mode=False)
+
+    @staticmethod
+    def _realistic_scores_bytes(rng, true_k, metric):
+        """Render a realistic gzipped scores file with sample data drawn from rng"""
         # Generate k values around the true k
-        k_values = list(range(max(1, true_k - 2), true_k + 4))
+        k_values = np.arange(max(1, true_k - 2), true_k + 4)
         headers = [f"k={k}" for k in k_values]
+        distance = np.abs(k_values - true_k)
 
         # Generate realistic scores based on metric type
-        scores = []
-        for k in k_values:
-            if metric in ["ari", "ami"]:
-                # ARI and AMI: higher is better, peak around true k
-                base_score = 0.95 if k == true_k else max(0.1, 0.95 - abs(k - true_k) * 0.2)
-                score = base_score + random.uniform(-0.05, 0.05)
-                scores.append(f"{max(0.0, min(1.0, score)):.3f}")
-            elif metric == "silhouette":
-                # Silhouette: higher is better, but different range
-                base_score = 0.8 if k == true_k else max(0.2, 0.8 - abs(k - true_k) * 0.15)
-                score = base_score + random.uniform(-0.1, 0.1)
-                scores.append(f"{max(-1.0, min(1.0, score)):.3f}")
-            else:
-                # Default random scores
-                scores.append(f"{random.uniform(0.0, 1.0):.3f}")
-
-        # Write to gzipped CSV
-        with gzip.open(file_path, 'wt') as f:
-            writer = csv.writer(f)
-            writer.writerow(headers)
-            writer.writerow(scores)
+        if metric in {"ari", "ami"}:
+            # ARI and AMI: higher is better, peak around true k
+            base = np.where(distance == 0, 0.95, np.maximum(0.1, 0.95 - distance * 0.2))
+            scores = np.clip(base + rng.uniform(-0.05, 0.05, size=k_values.size), 0.0, 1.0)
+        elif metric == "silhouette":
+            # Silhouette: higher is better, but different range
+            base = np.where(distance == 0, 0.8, np.maximum(0.2, 0.8 - distance * 0.15))
+            scores = np.clip(base + rng.uniform(-0.1, 0.1, size=k_values.size), -1.0, 1.0)
+        else:
+            # Default random scores
+            scores = rng.uniform(0.0, 1.0, size=k_values.size)
+        scores = np.char.mod("%.3f", scores)
+
+        # Gzipped CSV; headers and scores need no quoting
+        return gzip.compress((",".join(headers) + "\n" + ",".join(scores) + "\n").encode(), compresslevel=1)
 
     def test_process_run_integration(self):
         """Test the complete process_run function with realistic data"""
-        method_results, metric_results, backend, timestamp, anomaly_files, dir_name = process_run(
-            self.output_dir, debug_mode=False
-        )
+        method_results, metric_results, backend, timestamp, anomaly_files, dir_name = self._run_results
 
         # Test that we got results
         self.assertGreater(len(method_results), 0)
@@ -212,10 +270,10 @@ class TestIntegration(unittest.TestCase):
         self.assertGreater(len(unique_methods), 0)  # Should have some unique methods
 
         # Test that deduplication would work correctly
-        method_counts = {}
-        for r in method_results:
-            key = (r['dataset_generator'], r['dataset_name'], r['method'], r['seed'])
-            method_counts[key] = method_counts.get(key, 0) + 1
+        method_counts = Counter(
+            (r['dataset_generator'], r['dataset_name'], r['method'], r['seed'])
+            for r in method_results
+        )
 
         # Each method should appear multiple times (once per metric)
         for count in method_counts.values():
@@ -225,19 +283,28 @@ class TestIntegration(unittest.TestCase):
         # (since each method can have multiple metrics)
         self.assertGreaterEqual(len(metric_results), len(method_results))
 
-    def test_single_scores_file_processing(self):
-        """Test processing a single scores file"""
-        # Find a specific scores file
-        score_files = []
-        for root, dirs, files in os.walk(self.output_dir):
-            for file in files:
-                if file == "clustbench.scores.gz":
-                    score_files.append(os.path.join(root, file))
+    def test_process_run_parallel_matches_serial(self):
+        """Test that processing score files in a worker pool gives the serial results"""
+        parallel_results = process_run(self.output_dir, debug_mode=False, cores=2)
 
-        self.assertGreater(len(score_files), 0)
+        self.assertEqual(parallel_results, self._run_results)
 
-        # Process one file
-        score_file = score_files[0]
+    def test_process_parent_directory(self):
+        """Test that run directories are discovered inside a parent directory"""
+        method_results, metric_results, backend, timestamp, _, dir_name = process_run(
+            self.test_dir, debug_mode=False
+        )
+
+        self.assertEqual(len(metric_results), len(self._run_results[1]))
+        self.assertEqual(backend, "conda")
+        self.assertEqual(timestamp, "202506231301")
+        self.assertEqual(dir_name, os.path.basename(self.test_dir))
+
+    def test_single_scores_file_processing(self):
+        """Test processing a single scores file"""
+        # Process one of the score files created in setUpClass
+        self.assertGreater(len(self._score_files), 0)
+        score_file = self._score_files[0]
         method_result, metric_result = process_scores_file(
             score_file, "conda", "202506231301", self.output_dir
         )
@@ -247,13 +314,13 @@ class TestIntegration(unittest.TestCase):
         self.assertIsNotNone(metric_result)
 
         # Test method result content
-        self.assertIn(method_result['dataset_generator'], ["fcps", "sklearn", "synthetic"])
-        self.assertIn(method_result['method'], ["kmeans", "dbscan", "agglomerative"])
+        self.assertIn(method_result['dataset_generator'], self._DATASET_GENS)
+        self.assertIn(method_result['method'], self._METHODS)
         self.assertIsInstance(method_result['execution_time_seconds'], (float, int, type(None)))
         self.assertIsInstance(method_result['runtime'], (float, int, type(None)))
 
         # Test metric result content
-        self.assertIn(metric_result['metric'], ["ari", "ami", "silhouette"])
+        self.assertIn(metric_result['metric'], self._METRICS)
         self.assertIsInstance(metric_result['duplicate_k_anomaly'], bool)
         self.assertIsInstance(metric_result['empty_file'], bool)
         self.assertIsInstance(metric_result['missing_true_k_score'], bool)
@@ -265,53 +332,38 @@ class TestIntegration(unittest.TestCase):
 
     def test_data_consistency_across_methods_and_metrics(self):
         """Test that data is consistent across different aggregation levels"""
-        method_results, metric_results, _, _, _, _ = process_run(
-            self.output_dir, debug_mode=False
-        )
+        method_results, metric_results, _, _, _, _ = self._run_results
 
-        # Group results by method
-        method_groups = {}
-        for result in method_results:
-            key = (result['dataset_generator'], result['dataset_name'],
-                   result['method'], result['seed'])
-            method_groups[key] = result
+        key_cols = ['dataset_generator', 'dataset_name', 'method', 'seed']
+        common_fields = ['true_k', 'has_noise']
 
-        # Group metric results by method
-        metric_groups = {}
-        for result in metric_results:
-            key = (result['dataset_generator'], result['dataset_name'],
-                   result['method'], result['seed'])
-            if key not in metric_groups:
-                metric_groups[key] = []
-            metric_groups[key].append(result)
+        # One method row per key, joined against every metric row of that method
+        method_df = pd.DataFrame(method_results).drop_duplicates(key_cols, keep='last')
+        metric_df = pd.DataFrame(metric_results)
+        merged = metric_df[key_cols + common_fields].merge(
+            method_df[key_cols + common_fields], on=key_cols, how='outer',
+            suffixes=('_metric', '_method'), indicator=True
+        )
 
         # Test that every method has corresponding metric results
-        self.assertEqual(set(method_groups.keys()), set(metric_groups.keys()))
+        self.assertTrue((merged['_merge'] == 'both').all())
 
         # Test that dataset info is consistent between method and metric results
-        for key in method_groups.keys():
-            method_result = method_groups[key]
-            metric_result_list = metric_groups[key]
-
-            for metric_result in metric_result_list:
-                # Test that common fields match
-                common_fields = ['dataset_generator', 'dataset_name', 'true_k',
-                               'has_noise', 'method', 'seed']
-                for field in common_fields:
-                    self.assertEqual(method_result[field], metric_result[field],
-                                   f"Field {field} mismatch for {key}")
+        for field in common_fields:
+            with self.subTest(field=field):
+                pd.testing.assert_series_equal(
+                    merged[f'{field}_metric'], merged[f'{field}_method'], check_names=False
+                )
 
     def test_realistic_data_values(self):
         """Test that generated data has realistic values"""
-        method_results, metric_results, _, _, _, _ = process_run(
-            self.output_dir, debug_mode=False
-        )
+        method_results, metric_results, _, _, _, _ = self._run_results
 
         # Test method results
         for result in method_results:
             # Test that we have valid dataset info
-            self.assertIn(result['dataset_generator'], ["fcps", "sklearn", "synthetic"])
-            self.assertIn(result['dataset_name'], ["atom", "blobs", "moons"])
+            self.assertIn(result['dataset_generator'], self._DATASET_GENS)
+            self.assertIn(result['dataset_name'], self._DATASET_NAMES)
             # true_k and has_noise may be None if no labels file exists
             if result['true_k'] is not None:
                 self.assertIsInstance(result['true_k'], int)
@@ -329,7 +381,7 @@ class TestIntegration(unittest.TestCase):
 
         # Test metric results
         for result in metric_results:
-            self.assertIn(result['metric'], ["ari", "ami", "silhouette"])
+            self.assertIn(result['metric'], self._METRICS)
             self.assertIsInstance(result['duplicate_k_anomaly'], bool)
             self.assertIsInstance(result['empty_file'], bool)
             self.assertIsInstance(result['missing_true_k_score'], bool)
@@ -338,7 +390,7 @@ class TestIntegration(unittest.TestCase):
             k_columns = [col for col in result.keys() if col.startswith('k=')]
             for k_col in k_columns:
                 score = result[k_col]
-                if result['metric'] in ["ari", "ami"]:
+                if result['metric'] in {"ari", "ami"}:
                     self.assertGreaterEqual(score, 0.0)
                     self.assertLessEqual(score, 1.0)
                 elif result['metric'] == "silhouette":
@@ -354,12 +406,11 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(len(method_results), 0)
         self.assertEqual(len(metric_results), 0)
 
-        # Test with empty directory
-        empty_dir = os.path.join(self.test_dir, "empty")
-        os.makedirs(empty_dir)
-        method_results, metric_results, _, _, _, _ = process_run(
-            empty_dir, debug_mode=False
-        )
+        # Test with empty directory, kept out of the shared tree
+        with tempfile.TemporaryDirectory(dir=TMP_ROOT) as empty_dir:
+            method_results, metric_results, _, _, _, _ = process_run(
+                empty_dir, debug_mode=False
+            )
         self.assertEqual(len(method_results), 0)
         self.assertEqual(len(metric_results), 0)
 
@@ -369,14 +420,12 @@ class TestEndToEndProcessing(unittest.TestCase):
 
     def setUp(self):
         """Set up test environment"""
-        self.test_dir = tempfile.mkdtemp()
+        tmp = tempfile.TemporaryDirectory(dir=TMP_ROOT)
+        self.addCleanup(tmp.cleanup)
+        self.test_dir = tmp.name
         self.output_dir = os.path.join(self.test_dir, "test_output")
         os.makedirs(self.output_dir)
 
-    def tearDown(self):
-        """Clean up"""
-        shutil.rmtree(self.test_dir)
-
     @patch('aggregate_scores.pd.DataFrame.to_csv')
     @patch('aggregate_scores.pd.DataFrame.to_parquet')
     def test_main_function_integration(self, mock_parquet, mock_csv):
@@ -404,10 +453,8 @@ class TestEndToEndProcessing(unittest.TestCase):
 
         # Create scores file
         score_file = os.path.join(metric_dir, "clustbench.scores.gz")
-        with gzip.open(score_file, 'wt') as f:
-            writer = csv.writer(f)
-            writer.writerow(["k=1", "k=2", "k=3"])
-            writer.writerow(["0.5", "0.9", "0.7"])
+        with gzip.open(score_file, 'wt', compresslevel=1) as f:
+            f.write("k=1,k=2,k=3\n0.5,0.9,0.7\n")
 
         # Mock sys.argv to simulate command line arguments
         with patch('sys.argv', ['script.py', run_dir, '--out_dir', self.output_dir, '--format', 'both']):
@@ -433,6 +480,38 @@ class TestEndToEndProcessing(unittest.TestCase):
             self.assertEqual(metric_result['k=2'], 0.9)
             self.assertEqual(metric_result['k=3'], 0.7)
 
+    def test_main_default_format_with_na_scores(self):
+        """Test that the default parquet output stores "NA" scores as missing values"""
+        try:
+            pd.io.parquet.get_engine('auto')
+        except ImportError:
+            self.skipTest("no parquet engine installed")
+
+        run_dir = os.path.join(self.test_dir, "out-test_202501010000")
+        method_dir = os.path.join(run_dir, "data", "clustbench",
+                                  "dataset_generator-test_dataset_name-sample",
+                                  "clustering", "method-test_seed-1")
+        for metric, row in [("ari", "0.5,NA"), ("ami", "0.4,0.6")]:
+            metric_dir = os.path.join(method_dir, "metrics", "partition_metrics", f"metric-{metric}")
+            os.makedirs(metric_dir)
+            with open(os.path.join(metric_dir, "clustbench.scores.gz"), 'wb') as f:
+                f.write(gzip.compress(f"k=1,k=2\n{row}\n".encode(), compresslevel=1))
+
+        with patch('sys.argv', ['script.py', run_dir, '--out_dir', self.output_dir, '--cores', '1']):
+            main()
+
+        metric_files = [name for name in os.listdir(self.output_dir)
+                        if name.startswith("metric-performance_") and name.endswith(".parquet")]
+        self.assertEqual(len(metric_files), 1)
+        metric_df = pd.read_parquet(os.path.join(self.output_dir, metric_files[0])).set_index('metric')
+        self.assertEqual(metric_df.loc['ami', 'k=2'], 0.6)
+        self.assertTrue(pd.isna(metric_df.loc['ari', 'k=2']))
+        self.assertEqual(metric_df.loc['ari', 'k=1'], 0.5)
+
 
 if __name__ == '__main__':
-    unittest.main(verbosity=2)
+    from script_main import run_module
+
+    # Schedule by class so each worker builds the TestIntegration tree once and
+    # the classes run concurrently when pytest-xdist is available
+    run_module(__file__, ['-n', 'auto', '--dist', 'loadscope', '-v'], verbosity=2)